@@ -0,0 +1,290 @@
+"""Pembuat figur Plotly untuk dasbor & analisis, tanpa ketergantungan Streamlit.
+
+Setiap fungsi hanya bergantung pada DataFrame masukannya sehingga hasilnya
+bisa di-cache per (sidik jari data, jenis grafik) di aplikasi.
+
+Untuk katalog besar ukuran payload dibatasi: scatter memakai WebGL dan hanya
+produk dengan pendapatan terbesar, histogram & box plot dihitung di server
+dengan NumPy, dan teks hover dipersingkat.
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+
+# Di atas jumlah baris ini grafik memakai mode data besar (WebGL, statistik dari server)
+LARGE_CHART_ROWS = 5_000
+# Jumlah maksimum titik scatter/garis yang dikirim ke browser
+MAX_CHART_POINTS = 10_000
+HISTOGRAM_BINS = 20
+# Panjang maksimum nama produk di hover untuk data besar
+HOVER_NAME_CHARS = 40
+
+
+def _is_large(data):
+    return len(data) > LARGE_CHART_ROWS
+
+
+def _limit_points(data):
+    """Batasi titik scatter ke produk dengan pendapatan (absolut) terbesar"""
+    if len(data) <= MAX_CHART_POINTS:
+        return data, ""
+    limited = data.loc[data['Revenue'].abs().nlargest(MAX_CHART_POINTS).index]
+    return limited, f" ({MAX_CHART_POINTS:,} dari {len(data):,} produk, pendapatan terbesar)"
+
+
+def _hover_names(data):
+    """Nama produk untuk hover; dipersingkat pada data besar"""
+    names = data['Product Name'].astype(str)
+    if _is_large(data):
+        names = names.str.slice(0, HOVER_NAME_CHARS)
+    return names
+
+
+def _histogram_bar(values, bins=HISTOGRAM_BINS, **kwargs):
+    """Histogram yang dihitung di server: hanya `bins` batang yang dikirim"""
+    values = values.to_numpy(dtype='float64')
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=bins)
+    return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), **kwargs)
+
+
+def _box_trace(values, name):
+    """Box plot; untuk data besar kuartil dihitung di server tanpa mengirim semua titik"""
+    if len(values) <= LARGE_CHART_ROWS:
+        return go.Box(y=values, name=name, showlegend=False)
+    values = values.to_numpy(dtype='float64')
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return go.Box(y=[], name=name, showlegend=False)
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    return go.Box(
+        x=[name], q1=[q1], median=[median], q3=[q3], mean=[values.mean()],
+        lowerfence=[values[values >= q1 - 1.5 * iqr].min()],
+        upperfence=[values[values <= q3 + 1.5 * iqr].max()],
+        name=name, showlegend=False
+    )
+
+
+def top_revenue_bar(summary):
+    """10 produk teratas berdasarkan pendapatan"""
+    fig = px.bar(
+        summary.nlargest(10, 'Revenue'),
+        x='Revenue',
+        y='Product Name',
+        orientation='h',
+        title="Pendapatan per Produk",
+        color='Profit Margin %',
+        color_continuous_scale='RdYlGn',
+        text='Revenue'
+    )
+
+    fig.update_layout(
+        height=400,
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+
+    fig.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
+    return fig
+
+
+def margin_histogram(summary):
+    """Distribusi margin profit dengan garis rata-rata"""
+    fig = go.Figure(_histogram_bar(summary['Profit Margin %'], marker_color='#667eea'))
+    fig.update_layout(
+        title="Distribusi Margin Profit",
+        xaxis_title='Profit Margin %',
+        yaxis_title='count',
+        bargap=0
+    )
+
+    margins = summary['Profit Margin %']
+    mean_margin = margins[np.isfinite(margins)].mean()
+    fig.add_vline(
+        x=mean_margin,
+        line_dash="dash",
+        line_color="red",
+        annotation_text=f"Rata-rata: {mean_margin:.1f}%"
+    )
+
+    fig.update_layout(height=400)
+    return fig
+
+
+def revenue_profit_scatter(summary):
+    """Pendapatan vs profit per produk"""
+    plot_data, note = _limit_points(summary)
+    fig = px.scatter(
+        plot_data.assign(**{'Product Name': _hover_names(plot_data)}),
+        x='Revenue',
+        y='Profit',
+        size='TotalQty',
+        color='Profit Margin %',
+        hover_data=['Product Name'],
+        title="Analisis Pendapatan vs Profit" + note,
+        color_continuous_scale='RdYlGn',
+        labels={'Revenue': 'Pendapatan (Rp)', 'Profit': 'Profit (Rp)'},
+        render_mode='webgl' if _is_large(summary) else 'auto'
+    )
+
+    fig.update_layout(height=500)
+    return fig
+
+
+def margin_analysis(summary):
+    """Empat panel analisis margin profit"""
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Distribusi Margin Profit', 'Produk Teratas berdasarkan Margin',
+                      'Pendapatan vs Margin', 'Kuantitas vs Margin'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+
+    # Histogram (dihitung di server)
+    fig.add_trace(
+        _histogram_bar(summary['Profit Margin %'], name="Distribusi Margin", showlegend=False),
+        row=1, col=1
+    )
+
+    # Produk teratas berdasarkan margin
+    top_margin = summary.nlargest(10, 'Profit Margin %')
+    fig.add_trace(
+        go.Bar(x=top_margin['Product Name'], y=top_margin['Profit Margin %'],
+              name="Margin Tertinggi", showlegend=False),
+        row=1, col=2
+    )
+
+    # Scatter memakai WebGL untuk data besar
+    scatter = go.Scattergl if _is_large(summary) else go.Scatter
+    plot_data, note = _limit_points(summary)
+
+    # Scatter pendapatan vs margin
+    fig.add_trace(
+        scatter(x=plot_data['Revenue'],
+                y=plot_data['Profit Margin %'],
+                mode='markers', name="Pendapatan vs Margin", showlegend=False),
+        row=2, col=1
+    )
+
+    # Scatter kuantitas vs margin
+    fig.add_trace(
+        scatter(x=plot_data['TotalQty'],
+                y=plot_data['Profit Margin %'],
+                mode='markers', name="Kuantitas vs Margin", showlegend=False),
+        row=2, col=2
+    )
+
+    fig.update_layout(height=600, title_text="Analisis Komprehensif Margin Profit" + note)
+    return fig
+
+
+def performance_matrix(summary):
+    """Matriks kuantitas vs margin dengan garis kuadran di median"""
+    # Median kuadran dihitung dari semua produk, bukan hanya titik yang ditampilkan
+    median_qty = summary['TotalQty'].median()
+    median_margin = summary['Profit Margin %'].median()
+
+    plot_data, note = _limit_points(summary)
+    # Pastikan nilai size selalu positif (gunakan absolut + offset kecil)
+    plot_data = plot_data.assign(
+        size_value=plot_data['Revenue'].abs() + 1,
+        **{'Product Name': _hover_names(plot_data)}
+    )
+
+    fig = px.scatter(
+        plot_data,
+        x='TotalQty',
+        y='Profit Margin %',
+        size='size_value',  # Gunakan nilai yang sudah diperbaiki
+        color='Profit',
+        hover_name='Product Name',
+        hover_data={
+            'Revenue': ':,.0f',
+            'Profit': ':,.0f',
+            'TotalQty': ':,.0f',
+            'Profit Margin %': ':.1f',
+            'size_value': False  # Sembunyikan kolom size_value dari hover
+        } if not _is_large(summary) else {'size_value': False},  # data besar: hover cukup sumbu & warna
+        title="Matriks Kinerja Produk" + note,
+        labels={
+            'TotalQty': 'Total Kuantitas Terjual',
+            'Profit Margin %': 'Margin Profit (%)',
+            'Profit': 'Profit (Rp)'
+        },
+        color_continuous_scale='RdYlGn',
+        size_max=50,  # Batasi ukuran maksimum marker
+        render_mode='webgl' if _is_large(summary) else 'auto'
+    )
+
+    # Tambahkan garis kuadran
+    fig.add_hline(y=median_margin, line_dash="dash", line_color="red",
+                 annotation_text=f"Margin Median: {median_margin:.1f}%")
+    fig.add_vline(x=median_qty, line_dash="dash", line_color="red",
+                 annotation_text=f"Kuantitas Median: {median_qty:.0f}")
+
+    fig.update_layout(height=500)
+    return fig
+
+
+def sales_distribution(summary):
+    """Sebaran pendapatan, profit, kuantitas, dan kurva Pareto pendapatan"""
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Distribusi Pendapatan', 'Distribusi Profit',
+                      'Distribusi Kuantitas', 'Pendapatan Kumulatif'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+
+    # Distribusi pendapatan, profit, dan kuantitas
+    fig.add_trace(_box_trace(summary['Revenue'], "Pendapatan"), row=1, col=1)
+    fig.add_trace(_box_trace(summary['Profit'], "Profit"), row=1, col=2)
+    fig.add_trace(_box_trace(summary['TotalQty'], "Kuantitas"), row=2, col=1)
+
+    # Pendapatan kumulatif (Pareto); untuk data besar diambil titik berjarak sama
+    revenue = summary['Revenue'].sort_values(ascending=False).to_numpy()
+    cumulative_pct = revenue.cumsum() / revenue.sum() * 100
+    ranks = np.arange(1, len(revenue) + 1)
+    if len(revenue) > MAX_CHART_POINTS:
+        keep = np.unique(np.linspace(0, len(revenue) - 1, MAX_CHART_POINTS).astype(int))
+        ranks, cumulative_pct = ranks[keep], cumulative_pct[keep]
+
+    fig.add_trace(
+        go.Scatter(x=ranks,
+                  y=cumulative_pct,
+                  mode='lines+markers' if len(ranks) <= LARGE_CHART_ROWS else 'lines',
+                  name="Persentase Pendapatan Kumulatif", showlegend=False),
+        row=2, col=2
+    )
+
+    fig.update_layout(height=600, title_text="Analisis Distribusi Penjualan")
+    return fig
+
+
+def period_comparison(periods):
+    """Pendapatan & profit per periode tersimpan, satu baris panel per toko"""
+    fig = px.bar(
+        periods.sort_values('Period'),
+        x='Period',
+        y=['Total Revenue', 'Profit'],
+        barmode='group',
+        facet_row='Shop' if periods['Shop'].nunique() > 1 else None,
+        title="Pendapatan & Profit per Periode",
+        labels={'value': 'Rp', 'variable': 'Metrik'}
+    )
+    fig.update_layout(height=350 * max(1, periods['Shop'].nunique()))
+    return fig
+
+
+CHART_BUILDERS = {
+    'top_revenue': top_revenue_bar,
+    'margin_histogram': margin_histogram,
+    'revenue_profit': revenue_profit_scatter,
+    'margin_analysis': margin_analysis,
+    'performance_matrix': performance_matrix,
+    'sales_distribution': sales_distribution,
+    'period_comparison': period_comparison,
+}
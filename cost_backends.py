@@ -0,0 +1,188 @@
+"""Sumber data biaya produk: Google Sheets atau file JSON lokal.
+
+Modul ini sengaja tidak mengimpor Streamlit maupun gspread di level modul,
+sehingga bisa dipakai dari aplikasi, job batch, atau tanpa koneksi jaringan.
+"""
+import json
+import os
+import threading
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+DEFAULT_SHEET_ID = "1Kuy05JjpsZPoYZI0DcdaY7G_2_i63tdJOKTy-PWH26M"  # dari URL Google Sheet
+DEFAULT_SHEET_NAME = "Sheet1"
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_sheets_client(credentials_info):
+    """Klien gspread yang diotorisasi sekali per service account (singleton)"""
+    key = credentials_info.get("client_email", "")
+    with _clients_lock:
+        if key not in _clients:
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            creds = Credentials.from_service_account_info(dict(credentials_info), scopes=SCOPES)
+            _clients[key] = gspread.authorize(creds)
+        return _clients[key]
+
+
+class GoogleSheetCostBackend:
+    """Biaya disimpan di Google Sheets dengan kolom product_name & cost_per_unit"""
+
+    def __init__(self, credentials_info, sheet_id, sheet_name):
+        # credentials_info boleh berupa callable agar secrets baru dibaca saat dipakai
+        self._credentials_info = credentials_info
+        self.sheet_id = sheet_id
+        self.sheet_name = sheet_name
+        self.cache_key = ("gsheet", sheet_id, sheet_name)
+        self._worksheet = None
+
+    @property
+    def worksheet(self):
+        if self._worksheet is None:
+            info = self._credentials_info
+            if callable(info):
+                info = info()
+            gc = get_sheets_client(info)
+            self._worksheet = gc.open_by_key(self.sheet_id).worksheet(self.sheet_name)
+        return self._worksheet
+
+    def fetch_records(self):
+        return self.worksheet.get_all_records()
+
+    def build_cost_updates(self, records, cost_dict):
+        """Susun pembaruan sel minimal agar isi sheet (records) menjadi cost_dict"""
+        # Indeks baris: baris 1 header, data mulai baris 2
+        row_of = {}
+        current = {}
+        holes = []
+        for row_num, row in enumerate(records, start=2):
+            name = row["product_name"]
+            if name == "":
+                holes.append(row_num)
+                continue
+            if name in row_of:
+                # Duplikat: yang terakhir menang, baris sebelumnya dibebaskan
+                holes.append(row_of[name])
+            row_of[name] = row_num
+            try:
+                current[name] = float(row["cost_per_unit"])
+            except (TypeError, ValueError):
+                current[name] = None
+
+        writes = {}
+        if not records:
+            writes[1] = ["product_name", "cost_per_unit"]
+
+        # Produk yang dihapus meninggalkan lubang
+        occupied = {}
+        for name, row_num in row_of.items():
+            if name in cost_dict:
+                occupied[row_num] = name
+            else:
+                holes.append(row_num)
+        holes.sort()
+
+        # Produk berubah ditulis di tempat, produk baru mengisi lubang dulu
+        next_row = len(records) + 2
+        for name, cost in cost_dict.items():
+            if name in row_of:
+                if current[name] != float(cost):
+                    writes[row_of[name]] = [name, cost]
+                continue
+            if holes:
+                row_num = holes.pop(0)
+            else:
+                row_num = next_row
+                next_row += 1
+            occupied[row_num] = name
+            writes[row_num] = [name, cost]
+
+        # Rapatkan lubang sisa dengan memindahkan baris terakhir ke atas
+        for hole in holes:
+            last = max(occupied) if occupied else 0
+            if last > hole:
+                name = occupied.pop(last)
+                occupied[hole] = name
+                writes[hole] = [name, cost_dict[name]]
+                writes[last] = ["", ""]
+            else:
+                writes[hole] = ["", ""]
+
+        # Gabungkan baris berurutan menjadi satu rentang
+        updates = []
+        for row_num in sorted(writes):
+            if updates and updates[-1]["end"] == row_num - 1:
+                updates[-1]["end"] = row_num
+                updates[-1]["values"].append(writes[row_num])
+            else:
+                updates.append({"start": row_num, "end": row_num, "values": [writes[row_num]]})
+        return [
+            {"range": f"A{u['start']}:B{u['end']}", "values": u["values"]}
+            for u in updates
+        ]
+
+    def target_rows_unchanged(self, records, updates):
+        """Cek murah sebelum menulis: nama di kolom A pada baris target masih sama dengan records.
+
+        Hanya baris yang akan ditulis yang dibaca (satu batch_get), bukan seluruh sheet.
+        """
+        expected = ["product_name"] + [str(row["product_name"]) for row in records] if records else []
+        bounds = [
+            [int(cell[1:]) for cell in update["range"].split(":")]
+            for update in updates
+        ]
+        current = self.worksheet.batch_get([f"A{start}:A{end}" for start, end in bounds])
+        for (start, end), values in zip(bounds, current):
+            for offset, row_num in enumerate(range(start, end + 1)):
+                name = values[offset][0] if offset < len(values) and values[offset] else ""
+                wanted = expected[row_num - 1] if row_num - 1 < len(expected) else ""
+                if str(name) != wanted:
+                    return False
+        return True
+
+    def write(self, records, cost_dict):
+        """Kirim hanya baris yang berubah, ditambah, atau dihapus dalam satu batch.
+
+        records boleh berasal dari cache; jika baris target di sheet sudah
+        berubah (disisipkan, diurutkan, dihapus langsung di sheet), isi sheet
+        dibaca ulang dan pembaruan disusun ulang agar produk lain tidak tertimpa.
+        """
+        updates = self.build_cost_updates(records, cost_dict)
+        if updates and not self.target_rows_unchanged(records, updates):
+            records = self.fetch_records()
+            updates = self.build_cost_updates(records, cost_dict)
+        if updates:
+            self.worksheet.batch_update(updates)
+
+
+class JsonCostBackend:
+    """Biaya disimpan di file JSON lokal ({nama produk: biaya}), format sama dengan Ekspor Biaya"""
+
+    def __init__(self, path):
+        self.path = path
+        self.cache_key = ("json", os.path.abspath(path))
+
+    def fetch_records(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return [{"product_name": k, "cost_per_unit": v} for k, v in data.items()]
+
+    def write(self, records, cost_dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cost_dict, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def records_to_costs(records):
+    """Ubah baris biaya menjadi dict {nama produk: biaya per unit}"""
+    return {
+        row["product_name"]: float(row["cost_per_unit"])
+        for row in records if row["product_name"] != ""
+    }
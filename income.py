@@ -4,14 +4,21 @@ import json
 import os
 from datetime import datetime
 import io
+import hashlib
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import gspread
-from google.oauth2.service_account import Credentials
+from charts import CHART_BUILDERS
+from cost_backends import (
+    DEFAULT_SHEET_ID, DEFAULT_SHEET_NAME, GoogleSheetCostBackend, JsonCostBackend, records_to_costs
+)
+from ingest import (
+    ORDER_DATE, date_columns, detect_format, read_income, read_orders, to_parquet_bytes
+)
+from pipeline import REPORT_FORMATS, REPORT_SECTIONS, IncomePipeline, frame_fingerprint, page_rows
+from report_jobs import ReportJobs
+from search_index import NgramIndex
+from store import AnalyticsStore, infer_period
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -97,296 +104,121 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class IncomeApp:
+# Lama cache data biaya (detik) sebelum sumber biaya dibaca ulang
+COST_CACHE_TTL = 300
+
+@st.cache_data(ttl=COST_CACHE_TTL, show_spinner=False)
+def fetch_cost_records(cache_key, _backend):
+    """Ambil baris biaya dari backend, di-cache lintas sesi per sumber (sheet/file)"""
+    return _backend.fetch_records()
+
+@st.cache_resource(show_spinner=False)
+def get_cost_backend():
+    """Backend biaya: file JSON lokal jika COST_DATA_FILE diset, selain itu Google Sheets.
+
+    Otorisasi Google baru dilakukan saat biaya pertama kali dibaca/ditulis.
+    """
+    cost_file = os.environ.get("COST_DATA_FILE")
+    if cost_file:
+        return JsonCostBackend(cost_file)
+    return GoogleSheetCostBackend(
+        lambda: st.secrets["google_credentials"],
+        IncomeApp.SHEET_ID,
+        IncomeApp.SHEET_NAME
+    )
+
+# Jumlah file unggahan hasil parsing yang disimpan (LRU)
+UPLOAD_CACHE_ENTRIES = 8
+
+UPLOAD_READERS = {
+    'orders': read_orders,
+    'income': read_income,
+}
+
+@st.cache_data(max_entries=UPLOAD_CACHE_ENTRIES, show_spinner=False)
+def parse_upload(file_hash, _file_bytes, kind, fmt):
+    """Parsing file unggahan, di-cache per hash isi file + jenis & format ekspor"""
+    return UPLOAD_READERS[kind](io.BytesIO(_file_bytes), fmt=fmt)
+
+def read_upload(uploaded_file, kind):
+    """Baca file dari st.file_uploader tanpa parsing ulang jika isinya sama"""
+    file_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    fmt = detect_format(uploaded_file.name)
+    return parse_upload(file_hash, file_bytes, kind, fmt), file_hash
+
+@st.cache_data(max_entries=UPLOAD_CACHE_ENTRIES, show_spinner=False)
+def upload_as_parquet(file_hash, _df):
+    """Bytes Parquet dari unggahan yang sudah diparsing, di-cache per hash file"""
+    return to_parquet_bytes(_df)
+
+def show_parquet_download(uploaded_file, file_hash, df):
+    """Tombol unduh versi Parquet dari unggahan Excel agar analisis ulang lebih cepat"""
+    if detect_format(uploaded_file.name) != 'excel':
+        return
+    st.download_button(
+        label="⚡ Unduh sebagai Parquet",
+        data=upload_as_parquet(file_hash, df),
+        file_name=f"{os.path.splitext(uploaded_file.name)[0]}.parquet",
+        mime="application/octet-stream",
+        key=f"parquet_{file_hash}",
+        help="Unggah file Parquet ini lain kali untuk melewati parsing Excel"
+    )
+
+PROCESS_CACHE_ENTRIES = 4
+
+@st.cache_data(max_entries=PROCESS_CACHE_ENTRIES, show_spinner=False)
+def cached_sales_summary(data_key, _app, _pesanan_data, _income_data):
+    """Gabungan pesanan-pendapatan & ringkasan penjualan, di-cache per sidik jari input"""
+    return _app.build_sales_summary(_pesanan_data, _income_data)
+
+class IncomeApp(IncomePipeline):
     
     # 1. Konfigurasi Google Sheets
-    SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-    service_account_info = st.secrets["google_credentials"]
-    creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
-    gc = gspread.authorize(creds)
-
-    SHEET_ID = "1Kuy05JjpsZPoYZI0DcdaY7G_2_i63tdJOKTy-PWH26M"  # dari URL Google Sheet
-    SHEET_NAME = "Sheet1"
+    SHEET_ID = DEFAULT_SHEET_ID
+    SHEET_NAME = DEFAULT_SHEET_NAME
 
-    def __init__(self):
-        self.cost_data = self.load_cost_data()
+    def __init__(self, cost_backend=None):
+        self.cost_backend = cost_backend or get_cost_backend()
     
     def load_cost_data(self):
-        sheet = self.gc.open_by_key(self.SHEET_ID).worksheet(self.SHEET_NAME)
-        records = sheet.get_all_records()
-        return {row["product_name"]: float(row["cost_per_unit"]) for row in records}
+        records = fetch_cost_records(self.cost_backend.cache_key, self.cost_backend)
+        return records_to_costs(records)
+
+    def invalidate_cost_cache(self):
+        """Buang cache biaya agar pemuatan berikutnya membaca ulang sumber biaya"""
+        fetch_cost_records.clear(self.cost_backend.cache_key, self.cost_backend)
 
     def save_cost_data(self, cost_dict):
-        sheet = self.gc.open_by_key(self.SHEET_ID).worksheet(self.SHEET_NAME)
-        sheet.clear()
-        # pakai keyword atau urutan baru
-        sheet.update(values=[["product_name", "cost_per_unit"]], range_name="A1")
-        rows = [[k, v] for k, v in cost_dict.items()]
-        sheet.update(values=rows, range_name="A2")
-    
-    def get_product_cost(self, product_name, cost_data):
-        """Mendapatkan biaya produk dari data biaya"""
-        return float(cost_data.get(product_name, 0.0))
+        """Simpan biaya; backend Sheets hanya mengirim baris yang berubah.
+
+        Nomor baris diambil dari cache; backend memeriksa baris target di
+        sheet sebelum menulis dan membaca ulang jika cache sudah basi.
+        """
+        records = fetch_cost_records(self.cost_backend.cache_key, self.cost_backend)
+        self.cost_backend.write(records, cost_dict)
+        self.invalidate_cost_cache()
     
     def process_data(self, pesanan_data, income_data, cost_data):
-        """Memproses dan menggabungkan data"""
-        # Filter pesanan selesai
-        df1 = pesanan_data[pesanan_data['Order Status'] == 'Selesai']
-        
-        # Hapus duplikat dari data pendapatan
-        df2 = income_data.drop_duplicates(subset=['Order/adjustment ID'])
-        
-        # Gabungkan data
-        merged = pd.merge(df1, df2, left_on='Order ID', right_on='Order/adjustment ID', how='inner')
+        """Memproses dan menggabungkan data.
 
-        unique_orders = merged.drop_duplicates(subset=['Order ID'])
+        Hasil gabungan & groupby di-cache per sidik jari kedua file; jika hanya
+        biaya yang berubah, cukup kolom biaya/profit yang dihitung ulang.
+        """
+        data_key = (frame_fingerprint(pesanan_data), frame_fingerprint(income_data))
+        merged, summary = cached_sales_summary(data_key, self, pesanan_data, income_data)
         
-        if merged.empty:
+        if merged is None:
             return None, None
         
-        # Buat ringkasan
-        summary = unique_orders.groupby(['Seller SKU', 'Product Name', 'Variation'], as_index=False).agg(
-            TotalQty=('Quantity', 'sum'),
-            Revenue=('Total settlement amount', 'sum')
-        )
-        
-        # Tambahkan perhitungan biaya
-        summary['Cost per Unit'] = summary['Product Name'].apply(
-            lambda x: self.get_product_cost(x, cost_data)
-        )
-        summary['Total Cost'] = summary['TotalQty'] * summary['Cost per Unit']
-        summary['Profit'] = summary['Revenue'] - summary['Total Cost']
-        summary['Profit Margin %'] = (summary['Profit'] / summary['Revenue'] * 100).round(2)
-        summary['Share 60%'] = summary['Profit'] * 0.6
-        summary['Share 40%'] = summary['Profit'] * 0.4
-        
-        return merged, summary
-    
-    def create_excel_report(self, merged_data, summary_data, cost_data):
-        """Membuat laporan Excel"""
-        output = io.BytesIO()
-        
-        # Hitung total
-        unique_orders = merged_data.drop_duplicates(subset=['Order ID'])
-
-        total_orders  = unique_orders['Order ID'].nunique()
-        total_revenue = unique_orders['Total settlement amount'].sum()
-        total_qty     = unique_orders['Quantity'].sum()
-        
-        # Ringkasan berdasarkan SKU
-        # AFTER (tambahkan .rename langsung)
-        summary_by_sku = (
-            unique_orders.groupby('Seller SKU', as_index=False)
-            .agg({
-                'Quantity': 'sum',
-                'Order ID': 'nunique',
-                'Total settlement amount': 'sum'
-            })
-            .rename(columns={
-                'Quantity': 'Total Quantity',
-                'Order ID': 'Total Orders',
-                'Total settlement amount': 'Total Revenue'
-            })
-        )
-        
-        # Dapatkan nama produk pertama untuk setiap SKU
-        sku_products = merged_data.groupby('Seller SKU')['Product Name'].first().to_dict()
-        summary_by_sku['Cost per Unit'] = summary_by_sku['Seller SKU'].map(
-            lambda sku: self.get_product_cost(sku_products.get(sku, ''), cost_data)
-        )
-        summary_by_sku['Total Cost'] = summary_by_sku['Total Quantity'] * summary_by_sku['Cost per Unit']
-        summary_by_sku['Profit'] = summary_by_sku['Total Revenue'] - summary_by_sku['Total Cost']
-        summary_by_sku['Profit Margin %'] = (summary_by_sku['Profit'] / summary_by_sku['Total Revenue'] * 100).round(2)
-        summary_by_sku['Share 60%'] = summary_by_sku['Profit'] * 0.6
-        summary_by_sku['Share 40%'] = summary_by_sku['Profit'] * 0.4
-        
-        # Hitung total biaya dan profit
-        total_cost = summary_by_sku['Total Cost'].sum()
-        total_profit = total_revenue - total_cost
-        total_share_60 = total_profit * 0.6
-        total_share_40 = total_profit * 0.4
-        
-        # Analisis penjualan harian
-        date_column = None
-        possible_date_columns = [
-            'Order created time(UTC)', 'Order creation time', 'Order Creation Time', 
-            'Creation Time', 'Date', 'Order Date', 'Order created time', 'Created time'
-        ]
-        
-        for col in possible_date_columns:
-            if col in merged_data.columns:
-                date_column = col
-                break
-        
-        if date_column:
-            try:
-                # 1. tetap pakai merged_data_copy untuk tanggal, tapi aggregate dari unique_orders
-                merged_data_copy = merged_data.copy()
-                merged_data_copy['Order Date'] = pd.to_datetime(merged_data_copy[date_column]).dt.date
-
-                # 2. gabungkan tanggal dengan unique_orders
-                daily_sales = (
-                    merged_data_copy[['Order Date', 'Order ID', 'Quantity', 'Total settlement amount']]
-                    .drop_duplicates(subset=['Order ID'])
-                    .groupby('Order Date', as_index=False)
-                    .agg(
-                        Daily_Quantity=('Quantity', 'sum'),
-                        Daily_Orders=('Order ID', 'nunique'),
-                        Daily_Revenue=('Total settlement amount', 'sum')
-                    )
-                )
-
-            except:
-                daily_sales = pd.DataFrame({
-                    'Order Date': ['Data tidak tersedia'],
-                    'Daily Quantity': [0],
-                    'Daily Orders': [0],
-                    'Daily Revenue': [0]
-                })
-        else:
-            daily_sales = pd.DataFrame({
-                'Order Date': ['Kolom tanggal tidak ditemukan'],
-                'Daily Quantity': [0],
-                'Daily Orders': [0],
-                'Daily Revenue': [0]
-            })
-        
-        # Produk terbaik berdasarkan profit
-        # buat ringkasan bersih per produk dari unique_orders
-        top_products = (
-            unique_orders
-            .groupby('Product Name', as_index=False)
-            .agg(
-                TotalQty=('Quantity', 'sum'),
-                Revenue=('Total settlement amount', 'sum')
-            )
-            .assign(
-                Cost=lambda d: d['Product Name'].map(lambda x: app.get_product_cost(x, cost_data)),
-                Total_Cost=lambda d: d['TotalQty'] * d['Cost'],
-                Profit=lambda d: d['Revenue'] - d['Total_Cost'],
-                Profit_Margin=lambda d: (d['Profit'] / d['Revenue'] * 100).round(2)
-            )
-            .nlargest(10, 'Profit')
-        )
-        
-        # Buat penulis Excel
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
-            # Tentukan format
-            title_format = workbook.add_format({
-                'bold': True, 'font_size': 16, 'align': 'center',
-                'bg_color': '#4472C4', 'font_color': 'white'
-            })
-            
-            header_format = workbook.add_format({
-                'bold': True, 'font_size': 12,
-                'bg_color': '#D9E2F3', 'border': 1
-            })
-            
-            currency_format = workbook.add_format({
-                'num_format': '#,##0', 'border': 1
-            })
-            
-            number_format = workbook.add_format({
-                'num_format': '#,##0', 'border': 1
-            })
-            
-            percent_format = workbook.add_format({
-                'num_format': '0.00%', 'border': 1
-            })
-            
-            # Lembar ringkasan
-            overview_sheet = workbook.add_worksheet('Ringkasan')
-            overview_sheet.set_column('A:B', 25)
-            overview_sheet.set_column('C:C', 20)
-            
-            row = 0
-            overview_sheet.merge_range(f'A{row+1}:C{row+1}', 'LAPORAN PENJUALAN & ANALISIS PROFIT', title_format)
-            row += 2
-            
-            # Rentang tanggal
-            if date_column and date_column in merged_data.columns:
-                try:
-                    date_range_start = pd.to_datetime(merged_data[date_column]).min()
-                    date_range_end = pd.to_datetime(merged_data[date_column]).max()
-                except:
-                    date_range_start = datetime.now()
-                    date_range_end = datetime.now()
-            else:
-                date_range_start = datetime.now()
-                date_range_end = datetime.now()
-            
-            overview_sheet.write(row, 0, f'Periode:', header_format)
-            overview_sheet.write(row, 1, f'{date_range_start.strftime("%d/%m/%Y")} - {date_range_end.strftime("%d/%m/%Y")}')
-            row += 1
-            
-            overview_sheet.write(row, 0, f'Dibuat:', header_format)
-            overview_sheet.write(row, 1, f'{datetime.now().strftime("%d %B %Y %H:%M")}')
-            row += 3
-            
-            # Metrik kunci
-            overview_sheet.write(row, 0, 'RINGKASAN PENJUALAN & PROFIT', header_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Pesanan:')
-            overview_sheet.write(row, 1, total_orders, number_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Kuantitas:')
-            overview_sheet.write(row, 1, total_qty, number_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Pendapatan:')
-            overview_sheet.write(row, 1, total_revenue, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Biaya:')
-            overview_sheet.write(row, 1, total_cost, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Total Profit:')
-            overview_sheet.write(row, 1, total_profit, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Bagian 60%:')
-            overview_sheet.write(row, 1, total_share_60, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Bagian 40%:')
-            overview_sheet.write(row, 1, total_share_40, currency_format)
-            row += 2
-            
-            # Hitung metrik tambahan
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-            avg_profit_per_order = total_profit / total_orders if total_orders > 0 else 0
-            overall_profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-            
-            overview_sheet.write(row, 0, 'Nilai Rata-rata Pesanan:')
-            overview_sheet.write(row, 1, avg_order_value, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Rata-rata Profit per Pesanan:')
-            overview_sheet.write(row, 1, avg_profit_per_order, currency_format)
-            row += 1
-            overview_sheet.write(row, 0, 'Margin Profit Keseluruhan:')
-            overview_sheet.write(row, 1, overall_profit_margin / 100, percent_format)
-            
-            # Tulis lembar lainnya
-            summary_data.to_excel(writer, index=False, sheet_name='Ringkasan per Produk')
-            summary_by_sku.to_excel(writer, index=False, sheet_name='Ringkasan per SKU')
-            daily_sales.to_excel(writer, index=False, sheet_name='Penjualan Harian')
-            top_products.to_excel(writer, index=False, sheet_name='Produk Teratas')
-            
-            # Daftar biaya produk
-            if cost_data:
-                cost_df = pd.DataFrame(list(cost_data.items()), columns=["Product Name", "Cost per Unit"])
-                cost_df = cost_df.sort_values(by="Product Name")
-                cost_df.to_excel(writer, index=False, sheet_name='Daftar Biaya Produk')
-        
-        output.seek(0)
-        return output
-
+        return merged, self.apply_costs(summary, cost_data)
     
-
     def generate_ai_summary(self, summary_df):
         # --- Hitung metrik BERSIH (tanpa duplikat order) ---
         if st.session_state.merged_data is None:
             return "Data belum diproses."
 
-        unique_orders = st.session_state.merged_data.drop_duplicates(subset=['Order ID'])
+        unique_orders = get_derived_data()['unique_orders']
         total_r = unique_orders['Total settlement amount'].sum()
         total_cost = summary_df['Total Cost'].sum()
         total_p = total_r - total_cost
@@ -426,6 +258,258 @@ class IncomeApp:
         #return prompt  # opsional, sudah tampil di text_area
         
 
+@st.cache_resource(show_spinner=False)
+def get_analytics_store():
+    """Arsip lokal periode yang sudah diproses (folder INCOME_STORE_DIR)"""
+    return AnalyticsStore()
+
+def get_derived_data():
+    """Turunan dataset yang sedang diproses, dihitung sekali lalu disimpan di sesi"""
+    if st.session_state.get('derived_data') is None:
+        st.session_state.derived_data = app.build_derived_data(
+            st.session_state.merged_data, st.session_state.income_data
+        )
+    return st.session_state.derived_data
+
+# Jumlah laporan jadi (bytes) yang disimpan untuk diunduh ulang
+REPORT_CACHE_ENTRIES = 4
+
+@st.cache_resource(show_spinner=False)
+def get_report_jobs():
+    """Laporan yang sedang/sudah dibuat, dipakai ulang lintas rerun"""
+    return ReportJobs(max_entries=REPORT_CACHE_ENTRIES)
+
+def cost_version():
+    """Sidik jari data biaya saat ini untuk kunci cache"""
+    return hashlib.sha256(
+        json.dumps(sorted(st.session_state.cost_data.items())).encode()
+    ).hexdigest()
+
+@st.cache_resource(max_entries=4)
+def get_product_index(version, _product_names):
+    """Indeks trigram nama produk, dibangun sekali per versi data biaya"""
+    return NgramIndex(_product_names)
+
+def get_order_id_index():
+    """Indeks trigram Order ID tabel sumber order, dibangun sekali per dataset"""
+    derived = get_derived_data()
+    if 'order_id_index' not in derived:
+        derived['order_id_index'] = NgramIndex(derived['order_sources']['Order/adjustment ID'])
+    return derived['order_id_index']
+
+def data_fingerprint():
+    """Sidik jari data gabungan & ringkasan, dihitung sekali per dataset"""
+    derived = get_derived_data()
+    if 'fingerprint' not in derived:
+        derived['fingerprint'] = (
+            frame_fingerprint(st.session_state.merged_data),
+            frame_fingerprint(st.session_state.summary_data),
+        )
+    return derived['fingerprint']
+
+def report_key(report_format, sections):
+    """Kunci cache laporan: sidik jari dataset, versi biaya, format, dan bagian laporan"""
+    return data_fingerprint() + (cost_version(), report_format, tuple(sections))
+
+@st.fragment(run_every=0.5)
+def show_report_progress(key):
+    """Progres laporan yang sedang dibuat; hanya bagian ini yang diperbarui berkala"""
+    job = get_report_jobs().get(key)
+    if job is not None and not job.done:
+        st.progress(job.progress, text=f"⏳ {job.label}...")
+    else:
+        st.rerun()
+
+def show_report_export():
+    """Ekspor laporan di latar belakang; unduhan memakai bytes yang sudah jadi sampai data/biaya berubah"""
+    report_format = st.selectbox(
+        "📄 Format Laporan",
+        list(REPORT_FORMATS),
+        format_func=lambda fmt: {'excel': "Excel (.xlsx)", 'csv': "ZIP berisi CSV", 'parquet': "ZIP berisi Parquet"}[fmt],
+        key="report_format"
+    )
+    sections = st.multiselect(
+        "🧩 Bagian Laporan",
+        list(REPORT_SECTIONS),
+        default=list(REPORT_SECTIONS),
+        key="report_sections",
+        help="Bagian yang tidak dipilih tidak dihitung sama sekali"
+    )
+    if not sections:
+        st.warning("⚠️ Pilih minimal satu bagian laporan")
+        return
+    # Urutan lembar selalu mengikuti REPORT_SECTIONS
+    sections = [name for name in REPORT_SECTIONS if name in sections]
+    key = report_key(report_format, sections)
+    jobs = get_report_jobs()
+    job = jobs.get(key)
+    
+    if job is None or job.error is not None:
+        if job is not None:
+            st.error(f"Kesalahan: {str(job.error)}")
+        if st.button("📥 Ekspor Laporan", use_container_width=True):
+            # Thread latar tidak boleh membaca st.session_state; ambil datanya sekarang
+            merged = st.session_state.merged_data
+            summary = st.session_state.summary_data
+            cost_data = dict(st.session_state.cost_data)
+            derived = get_derived_data()
+            job = jobs.start(key, lambda progress: app.create_report(
+                merged, summary, cost_data, derived, fmt=report_format, progress=progress,
+                sections=sections
+            ).getvalue())
+    
+    if job is not None and not job.done:
+        show_report_progress(key)
+    elif job is not None and job.error is None:
+        extension, mime = REPORT_FORMATS[report_format]
+        st.download_button(
+            label="💾 Unduh Excel" if report_format == 'excel' else "💾 Unduh ZIP",
+            data=job.data,
+            file_name=f"income_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mime=mime,
+            use_container_width=True
+        )
+
+# Jumlah figur Plotly yang disimpan (per sidik jari data + jenis grafik)
+CHART_CACHE_ENTRIES = 32
+
+@st.cache_resource(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+def cached_figure(data_key, chart, _data):
+    """Figur Plotly, dibuat sekali per sidik jari data & jenis grafik lalu dipakai ulang"""
+    return CHART_BUILDERS[chart](_data)
+
+def show_chart(chart, data, data_key):
+    """Tampilkan grafik dari charts.CHART_BUILDERS; dibuat ulang hanya jika data_key berubah.
+
+    data_key harus berubah bersama datanya (mis. data_fingerprint()), agar
+    frame tidak di-hash ulang per grafik di setiap rerun.
+    """
+    st.plotly_chart(cached_figure(data_key, chart, data), use_container_width=True)
+
+# Kolom uang & persen pada tabel tampilan; nilainya tetap numerik (bisa diurutkan)
+MONEY_COLUMNS = {
+    'Revenue', 'Total Revenue', 'Total Cost', 'Profit', 'Share 60%', 'Share 40%', 'Cost per Unit',
+    'Customer refund', 'Total revenue', 'Total settlement amount', 'Total fees',
+    'Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee',
+}
+PERCENT_COLUMNS = {'Profit Margin %'}
+QUADRANT_COLUMNS = ['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']
+
+def table_column_config(df):
+    """Format tampilan per kolom lewat column_config, tanpa mengubah data menjadi teks"""
+    config = {}
+    for col in df.columns:
+        if col in MONEY_COLUMNS:
+            config[col] = st.column_config.NumberColumn(f"{col} (Rp)", format="localized", step=1)
+        elif col in PERCENT_COLUMNS:
+            config[col] = st.column_config.NumberColumn(col, format="%.1f%%")
+    return config
+
+def show_table(df):
+    """Tabel tampilan dengan format Rp/% dari table_column_config"""
+    st.dataframe(df, column_config=table_column_config(df), use_container_width=True, hide_index=True)
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+def show_paged_table(df, key, sort_by=None, ascending=False):
+    """Tabel berhalaman: hanya baris pada halaman aktif yang dikirim ke browser"""
+    total_rows = len(df)
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("📄 Baris per halaman", PAGE_SIZES, key=f"{key}_page_size")
+    page_count = max(1, -(-total_rows // page_size))
+    page_key = f"{key}_page"
+    # Halaman di luar jangkauan (mis. setelah filter mempersempit data) kembali ke 1
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = 1
+    with col2:
+        page = st.number_input("📑 Halaman", min_value=1, max_value=page_count, step=1, key=page_key)
+    with col3:
+        first_row = min(total_rows, (page - 1) * page_size + 1)
+        last_row = min(total_rows, page * page_size)
+        st.caption(f"Menampilkan baris {first_row:,}–{last_row:,} dari {total_rows:,} (halaman {page} dari {page_count})")
+
+    show_table(page_rows(df, page - 1, page_size, sort_by, ascending))
+
+def get_daily_cube():
+    """Kubus harian berbiaya, memakai biaya per unit yang sama dengan ringkasan yang tampil"""
+    derived = get_derived_data()
+    summary = st.session_state.summary_data
+    if derived.get('costed_cube_source') is not summary:
+        derived['unit_costs'] = dict(zip(summary['Product Name'].astype(str), summary['Cost per Unit']))
+        derived['costed_cube'] = app.cube_with_costs(derived['daily_cube'], derived['unit_costs'])
+        derived['costed_cube_source'] = summary
+    return derived['costed_cube']
+
+def show_date_filter():
+    """Pilihan rentang tanggal & mode pembanding untuk Dasbor dan Detail Data"""
+    st.session_state.date_filter = None
+    first, last = app.cube_date_range(get_daily_cube())
+    if first is None:
+        return
+    
+    st.markdown("**📆 Rentang Tanggal:**")
+    picked = st.date_input(
+        "Rentang tanggal",
+        value=(first.date(), last.date()),
+        min_value=first.date(),
+        max_value=last.date(),
+        key="date_range",
+        label_visibility="collapsed"
+    )
+    st.checkbox("↔️ Bandingkan dengan periode sebelumnya", key="compare_previous")
+    
+    # Saat memilih, date_input sementara hanya berisi tanggal awal
+    if len(picked) == 2 and (picked[0] > first.date() or picked[1] < last.date()):
+        st.session_state.date_filter = (pd.Timestamp(picked[0]), pd.Timestamp(picked[1]))
+
+def get_range_view():
+    """Ringkasan produk & metrik untuk rentang tanggal aktif, plus metrik periode sebelumnya.
+
+    Rentang dijawab dari kubus harian, bukan dengan memfilter & menggabung ulang data mentah.
+    """
+    summary = st.session_state.summary_data
+    date_filter = st.session_state.get('date_filter')
+    
+    if date_filter is None:
+        totals = app.compute_totals(get_derived_data()['unique_orders'], summary)
+    else:
+        cube = app.slice_cube(get_daily_cube(), *date_filter)
+        summary = app.cube_product_summary(cube, get_derived_data()['unit_costs'])
+        totals = app.cube_totals(cube)
+    
+    previous = None
+    if st.session_state.get('compare_previous'):
+        cube = get_daily_cube()
+        start, end = date_filter or app.cube_date_range(cube)
+        if start is not None:
+            previous = app.cube_totals(app.slice_cube(cube, *app.previous_range(start, end)))
+    return summary, totals, previous
+
+def range_view_key():
+    """Kunci data ringkasan dari get_range_view: dataset, versi biaya & rentang tanggal aktif"""
+    return data_fingerprint() + (cost_version(), st.session_state.get('date_filter'))
+
+def range_scope_note():
+    """Catatan order tanpa tanggal yang tidak ikut ringkasan rentang terfilter"""
+    if st.session_state.get('date_filter') is None:
+        return None
+    derived = get_derived_data()
+    if 'undated_orders' not in derived:
+        derived['undated_orders'] = int(derived['unique_orders'][ORDER_DATE].isna().sum())
+    if not derived['undated_orders']:
+        return None
+    return (f"{derived['undated_orders']:,} order tanpa tanggal tidak termasuk dalam rentang terpilih; "
+            "pilih seluruh periode untuk menyertakannya.")
+
+def change_label(current, previous, key):
+    """Teks delta st.metric terhadap periode sebelumnya"""
+    if previous is None:
+        return None
+    if not previous[key]:
+        return "Tidak ada data periode sebelumnya"
+    return f"{(current[key] - previous[key]) / abs(previous[key]) * 100:+.1f}% vs periode sebelumnya"
+
 def show_data_upload_section():
     """Bagian unggah data yang ditingkatkan"""
     st.markdown("### 📁 Unggah Data")
@@ -436,18 +520,20 @@ def show_data_upload_section():
         st.markdown('<div class="upload-section">', unsafe_allow_html=True)
         st.markdown("**📊 Pesanan Selesai**")
         pesanan_file = st.file_uploader(
-            "Unggah file Excel dengan pesanan selesai",
-            type=['xlsx', 'xls'],
+            "Unggah file Excel/CSV/Parquet dengan pesanan selesai",
+            type=['xlsx', 'xls', 'csv', 'parquet'],
             key="pesanan",
             help="File harus berisi data pesanan dengan kolom 'Order Status'"
         )
         
         if pesanan_file:
             try:
-                df = pd.read_excel(pesanan_file, header=0, skiprows=[1])
-                df.columns = df.columns.str.strip()
-                st.session_state.pesanan_data = df
+                df, file_hash = read_upload(pesanan_file, 'orders')
+                if st.session_state.get('pesanan_hash') != file_hash:
+                    st.session_state.pesanan_data = df
+                    st.session_state.pesanan_hash = file_hash
                 st.markdown(f'<div class="status-success">✅ Pesanan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
+                show_parquet_download(pesanan_file, file_hash, df)
                 
                 with st.expander("📋 Pratinjau Data"):
                     st.dataframe(df.head(), use_container_width=True)
@@ -461,18 +547,20 @@ def show_data_upload_section():
         st.markdown('<div class="upload-section">', unsafe_allow_html=True)
         st.markdown("**💰 Data Pendapatan**")
         income_file = st.file_uploader(
-            "Unggah file Excel dengan data pendapatan",
-            type=['xlsx', 'xls'],
+            "Unggah file Excel/CSV/Parquet dengan data pendapatan",
+            type=['xlsx', 'xls', 'csv', 'parquet'],
             key="income",
             help="File harus berisi kolom 'Order/adjustment ID' dan 'Total settlement amount'"
         )
         
         if income_file:
             try:
-                df = pd.read_excel(income_file)
-                df.columns = df.columns.str.strip()
-                st.session_state.income_data = df
+                df, file_hash = read_upload(income_file, 'income')
+                if st.session_state.get('income_hash') != file_hash:
+                    st.session_state.income_data = df
+                    st.session_state.income_hash = file_hash
                 st.markdown(f'<div class="status-success">✅ Pendapatan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
+                show_parquet_download(income_file, file_hash, df)
                 
                 with st.expander("📋 Pratinjau Data"):
                     st.dataframe(df.head(), use_container_width=True)
@@ -481,20 +569,76 @@ def show_data_upload_section():
                 st.markdown(f'<div class="status-error">❌ Kesalahan memuat file: {str(e)}</div>', unsafe_allow_html=True)
         
         st.markdown('</div>', unsafe_allow_html=True)
+    
+    if st.session_state.summary_data is not None:
+        show_incremental_upload()
+
+def show_incremental_upload():
+    """Tambahkan pesanan/pendapatan baru ke data yang sudah diproses tanpa proses ulang penuh"""
+    with st.expander("➕ Tambah Data Baru ke Periode Ini"):
+        st.caption("Order yang sudah ada diganti dengan versi barunya, order baru ditambahkan")
+        col1, col2 = st.columns(2)
+        with col1:
+            new_orders_file = st.file_uploader(
+                "Pesanan baru/berubah",
+                type=['xlsx', 'xls', 'csv', 'parquet'],
+                key="pesanan_increment"
+            )
+        with col2:
+            new_income_file = st.file_uploader(
+                "Pendapatan baru/berubah",
+                type=['xlsx', 'xls', 'csv', 'parquet'],
+                key="income_increment"
+            )
+        
+        if st.button("➕ Gabungkan Data Baru", use_container_width=True):
+            if not new_orders_file and not new_income_file:
+                st.warning("⚠️ Unggah minimal satu file data baru")
+                return
+            try:
+                new_orders = (read_upload(new_orders_file, 'orders')[0] if new_orders_file
+                              else st.session_state.pesanan_data.iloc[:0])
+                new_income = (read_upload(new_income_file, 'income')[0] if new_income_file
+                              else st.session_state.income_data.iloc[:0])
+                with st.spinner("Menggabungkan data baru..."):
+                    pesanan, income, merged, summary = app.apply_increment(
+                        st.session_state.pesanan_data,
+                        st.session_state.income_data,
+                        st.session_state.merged_data,
+                        st.session_state.summary_data,
+                        new_orders,
+                        new_income,
+                        st.session_state.cost_data
+                    )
+                st.session_state.pesanan_data = pesanan
+                st.session_state.income_data = income
+                st.session_state.merged_data = merged
+                st.session_state.summary_data = summary
+                st.session_state.derived_data = None
+                st.success(f"✅ Digabungkan: {len(new_orders):,} baris pesanan, {len(new_income):,} baris pendapatan")
+                st.rerun()
+            except Exception as e:
+                st.markdown(f'<div class="status-error">❌ Kesalahan menggabungkan data: {str(e)}</div>', unsafe_allow_html=True)
 
 def show_metrics_dashboard():
     """Dasbor metrik yang ditingkatkan"""
     if st.session_state.summary_data is not None:
         st.markdown("### 📊 Dasbor Kinerja")
         
-        # Hitung metrik kunci
-        unique_orders = st.session_state.merged_data.drop_duplicates(subset=['Order ID'])
-        total_orders = unique_orders['Order ID'].nunique()
-        total_revenue = unique_orders['Total settlement amount'].sum()
-        total_cost = st.session_state.summary_data['Total Cost'].sum()
-        total_profit = total_revenue - total_cost
-        total_share_60 = total_profit * 0.6
-        total_share_40 = total_profit * 0.4
+        # Hitung metrik kunci untuk rentang tanggal aktif
+        summary, totals, previous = get_range_view()
+        if st.session_state.get('date_filter') is not None:
+            start, end = st.session_state.date_filter
+            st.caption(f"📆 {start.strftime('%d %b %Y')} — {end.strftime('%d %b %Y')}")
+            scope_note = range_scope_note()
+            if scope_note:
+                st.caption(f"⚠️ {scope_note}")
+        total_orders = totals['Total Orders']
+        total_revenue = totals['Total Revenue']
+        total_cost = totals['Total Cost']
+        total_profit = totals['Profit']
+        total_share_60 = totals['Share 60%']
+        total_share_40 = totals['Share 40%']
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
         profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
         
@@ -505,21 +649,21 @@ def show_metrics_dashboard():
             st.metric(
                 label="💼 Total Pesanan",
                 value=f"{total_orders:,}",
-                delta=f"AOV: Rp {avg_order_value:,.0f}"
+                delta=change_label(totals, previous, 'Total Orders') or f"AOV: Rp {avg_order_value:,.0f}"
             )
         
         with col2:
             st.metric(
                 label="💰 Total Pendapatan",
                 value=f"Rp {total_revenue:,.0f}",
-                delta=f"Biaya: Rp {total_cost:,.0f}"
+                delta=change_label(totals, previous, 'Total Revenue') or f"Biaya: Rp {total_cost:,.0f}"
             )
         
         with col3:
             st.metric(
                 label="📈 Total Profit",
                 value=f"Rp {total_profit:,.0f}",
-                delta=f"{profit_margin:.1f}% margin"
+                delta=change_label(totals, previous, 'Profit') or f"{profit_margin:.1f}% margin"
             )
         
         with col4:
@@ -529,6 +673,14 @@ def show_metrics_dashboard():
                 delta=f"40%: Rp {total_share_40:,.0f}"
             )
         
+        # Produk tanpa biaya (dihitung dengan biaya 0)
+        missing_costs = app.missing_cost_products(
+            st.session_state.summary_data['Product Name'], st.session_state.cost_data
+        )
+        if missing_costs:
+            with st.expander(f"⚠️ {len(missing_costs)} produk belum memiliki biaya (dihitung Rp 0)"):
+                st.write(", ".join(missing_costs))
+        
         # AI Summary
         st.markdown("---")
         if st.button("📄 Tampilkan Ringkasan (Copy ke ChatGPT)", type="secondary"):
@@ -547,50 +699,14 @@ def show_metrics_dashboard():
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             st.markdown("**📊 10 Produk Teratas berdasarkan Pendapatan**")
             
-            top_revenue = st.session_state.summary_data.nlargest(10, 'Revenue')
-            
-            fig = px.bar(
-                top_revenue,
-                x='Revenue',
-                y='Product Name',
-                orientation='h',
-                title="Pendapatan per Produk",
-                color='Profit Margin %',
-                color_continuous_scale='RdYlGn',
-                text='Revenue'
-            )
-            
-            fig.update_layout(
-                height=400,
-                showlegend=False,
-                yaxis={'categoryorder': 'total ascending'}
-            )
-            
-            fig.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart('top_revenue', summary, range_view_key())
             st.markdown('</div>', unsafe_allow_html=True)
         
         with chart_col2:
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             st.markdown("**📈 Distribusi Margin Profit**")
             
-            fig = px.histogram(
-                st.session_state.summary_data,
-                x='Profit Margin %',
-                nbins=20,
-                title="Distribusi Margin Profit",
-                color_discrete_sequence=['#667eea']
-            )
-            
-            fig.add_vline(
-                x=st.session_state.summary_data['Profit Margin %'].mean(),
-                line_dash="dash",
-                line_color="red",
-                annotation_text=f"Rata-rata: {st.session_state.summary_data['Profit Margin %'].mean():.1f}%"
-            )
-            
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart('margin_histogram', summary, range_view_key())
             st.markdown('</div>', unsafe_allow_html=True)
         
         # Analisis terperinci
@@ -602,20 +718,27 @@ def show_metrics_dashboard():
         with analysis_col1:
             st.markdown("**🏆 Performa Teratas**")
             
-            top_profit = st.session_state.summary_data.nlargest(5, 'Profit')[['Product Name', 'Profit', 'Profit Margin %']]
-            top_profit['Profit'] = top_profit['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-            top_profit['Profit Margin %'] = top_profit['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-            
-            st.dataframe(top_profit, use_container_width=True, hide_index=True)
+            show_table(summary.nlargest(5, 'Profit')[['Product Name', 'Profit', 'Profit Margin %']])
         
         with analysis_col2:
             st.markdown("**⚠️ Produk Margin Rendah**")
             
-            low_margin = st.session_state.summary_data.nsmallest(5, 'Profit Margin %')[['Product Name', 'Profit', 'Profit Margin %']]
-            low_margin['Profit'] = low_margin['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-            low_margin['Profit Margin %'] = low_margin['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-            
-            st.dataframe(low_margin, use_container_width=True, hide_index=True)
+            show_table(summary.nsmallest(5, 'Profit Margin %')[['Product Name', 'Profit', 'Profit Margin %']])
+
+def load_costs_into_session():
+    """Muat biaya dari sumbernya ke session; kembalikan False jika gagal.
+
+    Selama belum pernah berhasil dimuat, cost_data hanyalah dict kosong dan
+    bukan isi sumber biaya, sehingga penulisan biaya dikunci (lihat
+    cost_data_loaded) agar sheet tidak tertimpa oleh data kosong tersebut.
+    """
+    try:
+        st.session_state.cost_data = app.load_cost_data()
+    except Exception as e:
+        st.warning(f"⚠️ Data biaya tidak dapat dimuat: {str(e)}")
+        return False
+    st.session_state.cost_data_loaded = True
+    return True
 
 def show_cost_management():
     """Antarmuka manajemen biaya yang ditingkatkan"""
@@ -639,8 +762,15 @@ def show_cost_management():
     
     with action_col3:
         if st.button("🔄 Segarkan Data", help="Muat ulang data biaya dari file"):
-            st.session_state.cost_data = app.load_cost_data()
-            st.rerun()
+            app.invalidate_cost_cache()
+            if load_costs_into_session():
+                st.rerun()
+    
+    # Tanpa data biaya yang berhasil dimuat, simpan/hapus akan menimpa sumber biaya
+    writable = st.session_state.cost_data_loaded
+    if not writable:
+        st.error("🔒 Data biaya belum berhasil dimuat, sehingga simpan & hapus biaya dinonaktifkan. "
+                 "Klik 🔄 Segarkan Data untuk mencoba lagi.")
     
     st.markdown("---")
     
@@ -681,7 +811,7 @@ def show_cost_management():
         btn_col1, btn_col2, btn_col3 = st.columns(3)
         
         with btn_col1:
-            if st.button("💾 Simpan Biaya", type="primary"):
+            if st.button("💾 Simpan Biaya", type="primary", disabled=not writable):
                 if selected_product and cost_input >= 0:
                     st.session_state.cost_data[selected_product] = cost_input
                     app.save_cost_data(st.session_state.cost_data)
@@ -691,7 +821,7 @@ def show_cost_management():
                     st.warning("⚠️ Masukkan produk dan biaya yang valid")
         
         with btn_col2:
-            if st.button("🗑️ Hapus Biaya", type="secondary"):
+            if st.button("🗑️ Hapus Biaya", type="secondary", disabled=not writable):
                 if selected_product in st.session_state.cost_data:
                     del st.session_state.cost_data[selected_product]
                     app.save_cost_data(st.session_state.cost_data)
@@ -729,20 +859,21 @@ def show_cost_management():
         search_term = st.text_input("🔍 Cari produk", placeholder="Ketik untuk mencari...")
         
         cost_df = pd.DataFrame(
-            list(st.session_state.cost_data.items()),
+            sorted(st.session_state.cost_data.items()),
             columns=["Product Name", "Cost per Unit"]
         )
         
         if search_term:
-            cost_df = cost_df[cost_df['Product Name'].str.contains(search_term, case=False, na=False)]
-        
-        cost_df = cost_df.sort_values("Product Name")
-        
-        # Format untuk tampilan
-        cost_display = cost_df.copy()
-        cost_display['Cost per Unit'] = cost_display['Cost per Unit'].apply(lambda x: f"Rp {x:,.0f}")
-        
-        st.dataframe(cost_display, use_container_width=True, hide_index=True)
+            product_index = get_product_index(cost_version(), cost_df['Product Name'])
+            matches = product_index.search(search_term)
+            if matches.size == 0:
+                # Tidak ada yang memuat kata kunci; tampilkan nama yang mirip (salah ketik)
+                matches, _ = product_index.fuzzy_search(search_term)
+                if matches.size > 0:
+                    st.caption("🔎 Tidak ada yang cocok persis, menampilkan produk dengan nama mirip")
+            cost_df = cost_df.iloc[matches]
+        
+        show_table(cost_df)
     else:
         st.info("ℹ️ Tidak ada data biaya. Tambahkan beberapa biaya produk untuk memulai.")
 
@@ -757,117 +888,21 @@ def show_advanced_analytics():
             ["Pendapatan vs Profit (Scatter)", "Analisis Margin Profit", "Matriks Kinerja Produk", "Distribusi Penjualan"]
         )
         
+        summary = st.session_state.summary_data
+        
         if chart_type == "Pendapatan vs Profit (Scatter)":
-            fig = px.scatter(
-                st.session_state.summary_data,
-                x='Revenue',
-                y='Profit',
-                size='TotalQty',
-                color='Profit Margin %',
-                hover_data=['Product Name'],
-                title="Analisis Pendapatan vs Profit",
-                color_continuous_scale='RdYlGn',
-                labels={'Revenue': 'Pendapatan (Rp)', 'Profit': 'Profit (Rp)'}
-            )
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart('revenue_profit', summary, data_fingerprint())
         
         elif chart_type == "Analisis Margin Profit":
-            # Buat subplot
-            fig = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=('Distribusi Margin Profit', 'Produk Teratas berdasarkan Margin', 
-                              'Pendapatan vs Margin', 'Kuantitas vs Margin'),
-                specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                       [{"secondary_y": False}, {"secondary_y": False}]]
-            )
-            
-            # Histogram
-            fig.add_trace(
-                go.Histogram(x=st.session_state.summary_data['Profit Margin %'], 
-                           name="Distribusi Margin", showlegend=False),
-                row=1, col=1
-            )
-            
-            # Produk teratas berdasarkan margin
-            top_margin = st.session_state.summary_data.nlargest(10, 'Profit Margin %')
-            fig.add_trace(
-                go.Bar(x=top_margin['Product Name'], y=top_margin['Profit Margin %'],
-                      name="Margin Tertinggi", showlegend=False),
-                row=1, col=2
-            )
-            
-            # Scatter pendapatan vs margin
-            fig.add_trace(
-                go.Scatter(x=st.session_state.summary_data['Revenue'], 
-                          y=st.session_state.summary_data['Profit Margin %'],
-                          mode='markers', name="Pendapatan vs Margin", showlegend=False),
-                row=2, col=1
-            )
-            
-            # Scatter kuantitas vs margin
-            fig.add_trace(
-                go.Scatter(x=st.session_state.summary_data['TotalQty'], 
-                          y=st.session_state.summary_data['Profit Margin %'],
-                          mode='markers', name="Kuantitas vs Margin", showlegend=False),
-                row=2, col=2
-            )
-            
-            fig.update_layout(height=600, title_text="Analisis Komprehensif Margin Profit")
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart('margin_analysis', summary, data_fingerprint())
         
         elif chart_type == "Matriks Kinerja Produk":
-            # Buat matriks kinerja dengan perbaikan untuk nilai negatif
-            plot_data = st.session_state.summary_data.copy()
-            
-            # Pastikan nilai size selalu positif (gunakan absolut + offset kecil)
-            plot_data['size_value'] = plot_data['Revenue'].abs() + 1
-            
-            # Buat informasi hover yang lebih informatif
-            plot_data['hover_text'] = (
-                plot_data['Product Name'] + '<br>' +
-                'Revenue: Rp ' + plot_data['Revenue'].apply(lambda x: f"{x:,.0f}") + '<br>' +
-                'Profit: Rp ' + plot_data['Profit'].apply(lambda x: f"{x:,.0f}") + '<br>' +
-                'Margin: ' + plot_data['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-            )
-            
-            fig = px.scatter(
-                plot_data,
-                x='TotalQty',
-                y='Profit Margin %',
-                size='size_value',  # Gunakan nilai yang sudah diperbaiki
-                color='Profit',
-                hover_name='Product Name',
-                hover_data={
-                    'Revenue': ':,.0f',
-                    'Profit': ':,.0f',
-                    'TotalQty': ':,.0f',
-                    'Profit Margin %': ':.1f',
-                    'size_value': False  # Sembunyikan kolom size_value dari hover
-                },
-                title="Matriks Kinerja Produk",
-                labels={
-                    'TotalQty': 'Total Kuantitas Terjual', 
-                    'Profit Margin %': 'Margin Profit (%)',
-                    'Profit': 'Profit (Rp)'
-                },
-                color_continuous_scale='RdYlGn',
-                size_max=50  # Batasi ukuran maksimum marker
-            )
+            show_chart('performance_matrix', summary, data_fingerprint())
             
-            # Tambahkan garis kuadran
+            plot_data = summary
             median_qty = plot_data['TotalQty'].median()
             median_margin = plot_data['Profit Margin %'].median()
             
-            fig.add_hline(y=median_margin, line_dash="dash", line_color="red", 
-                         annotation_text=f"Margin Median: {median_margin:.1f}%")
-            fig.add_vline(x=median_qty, line_dash="dash", line_color="red", 
-                         annotation_text=f"Kuantitas Median: {median_qty:.0f}")
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
-            
             # Analisis kuadran
             st.markdown("**📊 Analisis Kuadran:**")
             quad_col1, quad_col2, quad_col3, quad_col4 = st.columns(4)
@@ -921,89 +956,30 @@ def show_advanced_analytics():
             
             with quad_tab1:
                 if len(stars) > 0:
-                    display_stars = stars[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_stars['Revenue'] = display_stars['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_stars['Profit'] = display_stars['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_stars['Profit Margin %'] = display_stars['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_stars.sort_values('TotalQty', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(stars[QUADRANT_COLUMNS].sort_values('TotalQty', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
             
             with quad_tab2:
                 if len(workhorses) > 0:
-                    display_workhorses = workhorses[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_workhorses['Revenue'] = display_workhorses['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_workhorses['Profit'] = display_workhorses['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_workhorses['Profit Margin %'] = display_workhorses['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_workhorses.sort_values('TotalQty', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(workhorses[QUADRANT_COLUMNS].sort_values('TotalQty', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
             
             with quad_tab3:
                 if len(niche) > 0:
-                    display_niche = niche[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_niche['Revenue'] = display_niche['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_niche['Profit'] = display_niche['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_niche['Profit Margin %'] = display_niche['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_niche.sort_values('Profit Margin %', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(niche[QUADRANT_COLUMNS].sort_values('Profit Margin %', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
             
             with quad_tab4:
                 if len(problem) > 0:
-                    display_problem = problem[['Product Name', 'TotalQty', 'Revenue', 'Profit', 'Profit Margin %']].copy()
-                    display_problem['Revenue'] = display_problem['Revenue'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_problem['Profit'] = display_problem['Profit'].apply(lambda x: f"Rp {x:,.0f}")
-                    display_problem['Profit Margin %'] = display_problem['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-                    st.dataframe(display_problem.sort_values('Profit Margin %', ascending=False), use_container_width=True, hide_index=True)
+                    show_table(problem[QUADRANT_COLUMNS].sort_values('Profit Margin %', ascending=False))
                 else:
                     st.info("Tidak ada produk dalam kategori ini")
         
         elif chart_type == "Distribusi Penjualan":
-            # Buat analisis distribusi
-            fig = make_subplots(
-                rows=2, cols=2,
-                subplot_titles=('Distribusi Pendapatan', 'Distribusi Profit', 
-                              'Distribusi Kuantitas', 'Pendapatan Kumulatif'),
-                specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                       [{"secondary_y": False}, {"secondary_y": False}]]
-            )
-            
-            # Distribusi pendapatan
-            fig.add_trace(
-                go.Box(y=st.session_state.summary_data['Revenue'], 
-                      name="Pendapatan", showlegend=False),
-                row=1, col=1
-            )
-            
-            # Distribusi profit
-            fig.add_trace(
-                go.Box(y=st.session_state.summary_data['Profit'], 
-                      name="Profit", showlegend=False),
-                row=1, col=2
-            )
-            
-            # Distribusi kuantitas
-            fig.add_trace(
-                go.Box(y=st.session_state.summary_data['TotalQty'], 
-                      name="Kuantitas", showlegend=False),
-                row=2, col=1
-            )
-            
-            # Pendapatan kumulatif (Pareto)
-            sorted_data = st.session_state.summary_data.sort_values('Revenue', ascending=False)
-            sorted_data['Cumulative Revenue'] = sorted_data['Revenue'].cumsum()
-            sorted_data['Cumulative %'] = (sorted_data['Cumulative Revenue'] / sorted_data['Revenue'].sum()) * 100
-            
-            fig.add_trace(
-                go.Scatter(x=list(range(1, len(sorted_data) + 1)), 
-                          y=sorted_data['Cumulative %'],
-                          mode='lines+markers', name="Persentase Pendapatan Kumulatif", showlegend=False),
-                row=2, col=2
-            )
-            
-            fig.update_layout(height=600, title_text="Analisis Distribusi Penjualan")
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart('sales_distribution', summary, data_fingerprint())
         
         # Wawasan tambahan
 
@@ -1092,6 +1068,72 @@ def show_advanced_analytics():
     else:
         st.info("ℹ️ Silakan proses data Anda terlebih dahulu untuk melihat analisis lanjutan")
 
+def show_period_archive():
+    """Simpan periode yang sedang diproses dan buka kembali periode lama"""
+    store = get_analytics_store()
+    st.markdown("**🗄️ Arsip Periode:**")
+    
+    if st.session_state.summary_data is not None:
+        shop = st.text_input("🏪 Nama Toko", value=st.session_state.get('active_shop', ""), key="archive_shop")
+        period = st.text_input(
+            "📅 Periode (YYYY-MM)",
+            value=st.session_state.get('active_period') or datetime.now().strftime('%Y-%m'),
+            key="archive_period"
+        )
+        if st.button("💾 Simpan Periode", use_container_width=True):
+            if shop and period:
+                store.save(shop, period, {
+                    'orders': st.session_state.pesanan_data,
+                    'income': st.session_state.income_data,
+                    'merged': st.session_state.merged_data,
+                    'summary': st.session_state.summary_data,
+                }, app.compute_totals(get_derived_data()['unique_orders'], st.session_state.summary_data))
+                st.session_state.active_shop = shop
+                st.success(f"✅ Disimpan: {shop} — {period}")
+            else:
+                st.warning("⚠️ Masukkan nama toko dan periode")
+    
+    periods = store.list_periods()
+    if periods.empty:
+        st.caption("Belum ada periode tersimpan")
+        return
+    
+    options = list(zip(periods['Shop'], periods['Period']))
+    selected = st.selectbox(
+        "📂 Periode Tersimpan",
+        options,
+        format_func=lambda option: f"{option[0]} — {option[1]}",
+        key="archive_select"
+    )
+    if st.button("📂 Buka Periode", use_container_width=True):
+        # Arsip batch --chunksize tidak punya pendapatan lengkap; analisis refund dilewati
+        frames = store.load(*selected, frames=('orders', 'income', 'merged', 'summary'))
+        st.session_state.pesanan_data = frames['orders']
+        st.session_state.income_data = frames['income']
+        st.session_state.merged_data = frames['merged']
+        st.session_state.summary_data = frames['summary']
+        st.session_state.derived_data = None
+        st.session_state.active_shop, st.session_state.active_period = selected
+        st.rerun()
+
+def show_period_comparison():
+    """Perbandingan metrik utama antar periode yang tersimpan di arsip"""
+    periods = get_analytics_store().list_periods()
+    if periods.empty:
+        return
+    
+    st.markdown("---")
+    st.markdown("### 🗄️ Perbandingan Periode Tersimpan")
+    
+    # Daftar periode hanya berisi metrik dari meta.json (satu baris per partisi), murah dijadikan kunci
+    archive_key = tuple(periods.itertuples(index=False, name=None))
+    show_chart('period_comparison', periods, archive_key)
+    
+    show_table(
+        periods[['Shop', 'Period', 'Total Orders', 'Total Quantity', 'Total Revenue',
+                 'Total Cost', 'Profit', 'Profit Margin %', 'Saved At']]
+    )
+
 def main():
     # Header
     st.markdown("""
@@ -1107,7 +1149,10 @@ def main():
     
     # Inisialisasi state sesi
     if 'cost_data' not in st.session_state:
-        st.session_state.cost_data = app.load_cost_data()
+        # Tetap bisa memproses unggahan tanpa data biaya (mis. offline)
+        st.session_state.cost_data = {}
+        st.session_state.cost_data_loaded = False
+        load_costs_into_session()
     if 'pesanan_data' not in st.session_state:
         st.session_state.pesanan_data = None
     if 'income_data' not in st.session_state:
@@ -1116,6 +1161,8 @@ def main():
         st.session_state.merged_data = None
     if 'summary_data' not in st.session_state:
         st.session_state.summary_data = None
+    if 'derived_data' not in st.session_state:
+        st.session_state.derived_data = None
     
     # Sidebar
     with st.sidebar:
@@ -1148,6 +1195,11 @@ def main():
                     if merged is not None:
                         st.session_state.merged_data = merged
                         st.session_state.summary_data = summary
+                        st.session_state.derived_data = None
+                        # Tanggal order sudah diparsing sekali di data turunan
+                        st.session_state.active_period = infer_period(
+                            get_derived_data()['unique_orders'][ORDER_DATE]
+                        )
                         st.success("✅ Data diproses!")
                         st.rerun()
                     else:
@@ -1156,23 +1208,15 @@ def main():
                 st.warning("⚠️ Unggah kedua file terlebih dahulu")
         
         if st.session_state.summary_data is not None:
-            if st.button("📥 Ekspor Laporan", use_container_width=True):
-                try:
-                    excel_data = app.create_excel_report(
-                        st.session_state.merged_data,
-                        st.session_state.summary_data,
-                        st.session_state.cost_data
-                    )
-                    
-                    st.download_button(
-                        label="💾 Unduh Excel",
-                        data=excel_data,
-                        file_name=f"income_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-                except Exception as e:
-                    st.error(f"Kesalahan: {str(e)}")
+            show_report_export()
+        
+        st.markdown("---")
+        
+        if st.session_state.summary_data is not None:
+            show_date_filter()
+            st.markdown("---")
+        
+        show_period_archive()
         
         st.markdown("---")
         
@@ -1203,6 +1247,7 @@ def main():
     
     with tab3:
         show_advanced_analytics()
+        show_period_comparison()
 
 
 
@@ -1223,24 +1268,22 @@ def main():
         st.subheader("📅 Ringkasan Periode Data")
         
         merged = st.session_state.merged_data
-        date_cols = [
-            'Order created time(UTC)', 'Order settled time(UTC)',
-            'Order creation time', 'Order creation date', 'Order Date'
-        ]
-        date_col = next((c for c in date_cols if c in merged.columns), None)
+        start, end = app.cube_date_range(get_derived_data()['daily_cube'])
 
         col1, col2 = st.columns([1, 1])
         
         with col1:
-            if date_col:
-                try:
-                    start = pd.to_datetime(merged[date_col]).min().strftime('%d %b %Y')
-                    end = pd.to_datetime(merged[date_col]).max().strftime('%d %b %Y')
-                    st.success(f"📆 **Periode Data:** {start} — {end}")
-                except Exception:
-                    st.warning("⚠️ Periode data tidak dapat ditentukan")
+            if start is not None:
+                st.success(f"📆 **Periode Data:** {start.strftime('%d %b %Y')} — {end.strftime('%d %b %Y')}")
             else:
-                st.warning("⚠️ Kolom tanggal tidak ditemukan")
+                st.warning("⚠️ Periode data tidak dapat ditentukan")
+
+            unparsed = get_derived_data()['unparsed_dates']
+            if not unparsed.empty:
+                st.warning(f"⚠️ {len(unparsed)} order memiliki tanggal yang tidak dapat dibaca "
+                           "dan tidak masuk filter tanggal maupun penjualan harian")
+                with st.expander("📋 Lihat Order dengan Tanggal Tidak Terbaca"):
+                    show_table(unparsed[['Order ID'] + date_columns(unparsed)])
 
         with col2:
             # Order duplicates info
@@ -1253,6 +1296,30 @@ def main():
                 st.write("**Order ID yang terdeteksi duplikat:**")
                 st.code(", ".join(map(str, dup_ids.index.tolist()[:10])) + ("..." if len(dup_ids) > 10 else ""))
 
+        # Metrik rentang tanggal aktif (dari kubus harian)
+        range_summary, range_totals, previous = get_range_view()
+        if st.session_state.get('date_filter') is not None or previous is not None:
+            if st.session_state.get('date_filter') is not None:
+                range_start, range_end = st.session_state.date_filter
+                st.markdown(f"**📆 Rentang Terpilih:** {range_start.strftime('%d %b %Y')} — {range_end.strftime('%d %b %Y')}")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("📦 Order", f"{range_totals['Total Orders']:,}",
+                          delta=change_label(range_totals, previous, 'Total Orders'))
+            with col2:
+                st.metric("📏 PCS", f"{range_totals['Total Quantity']:,}",
+                          delta=change_label(range_totals, previous, 'Total Quantity'))
+            with col3:
+                st.metric("💵 Pendapatan", f"Rp {range_totals['Total Revenue']:,.0f}",
+                          delta=change_label(range_totals, previous, 'Total Revenue'))
+            with col4:
+                st.metric("💰 Profit", f"Rp {range_totals['Profit']:,.0f}",
+                          delta=change_label(range_totals, previous, 'Profit'))
+            st.caption("Rentang tanggal berlaku untuk metrik di atas dan tabel produk; bagian lain mencakup seluruh periode.")
+            scope_note = range_scope_note()
+            if scope_note:
+                st.caption(f"⚠️ {scope_note}")
+
         st.divider()
         # -----------------------------------------------------------------
         # METRIK ORDER & PCS (TANPA REFUND & DUPLIKAT)
@@ -1260,17 +1327,8 @@ def main():
         st.subheader("📊 Ringkasan Order & Kuantitas Bersih")
 
         # --- hitungan bersih ---------------------------------------------
-        income = st.session_state.income_data
-        no_refund = income[income['Customer refund'] >= 0].drop_duplicates(subset=['Order/adjustment ID'])
-
-        orders = st.session_state.pesanan_data
-        orders_done = orders[orders['Order Status'] == 'Selesai'].drop_duplicates(subset=['Order ID'])
-
-        merged_clean = (
-            pd.merge(orders_done, no_refund,
-                    left_on='Order ID', right_on='Order/adjustment ID', how='inner')
-            .drop_duplicates(subset=['Order ID'])
-        )
+        derived = get_derived_data()
+        merged_clean = derived['clean_orders']
 
         total_orders = merged_clean['Order ID'].nunique()
         total_pcs    = merged_clean['Quantity'].sum()
@@ -1343,8 +1401,8 @@ def main():
         st.subheader("🔍 Filter & Analisis Produk")
 
         # --- Info Grand Total (selalu tampil) ---------------------------
-        grand_total_rev = st.session_state.summary_data['Revenue'].sum()
-        grand_total_pro = st.session_state.summary_data['Profit'].sum()
+        grand_total_rev = range_summary['Revenue'].sum()
+        grand_total_pro = range_summary['Profit'].sum()
 
         col_grand1, col_grand2 = st.columns(2)
         with col_grand1:
@@ -1368,12 +1426,12 @@ def main():
                 sort_by = st.selectbox("📊 Urutkan berdasarkan",
                                     ["Revenue", "Profit", "Profit Margin %", "Quantity"])
 
-        # --- Terapkan filter --------------------------------------------
-        filtered = st.session_state.summary_data[
-            (st.session_state.summary_data['Revenue'] >= min_rev) &
-            (st.session_state.summary_data['Profit'] >= min_pro) &
-            (st.session_state.summary_data['Profit Margin %'] >= min_mar)
-        ].sort_values(sort_by, ascending=False)
+        # --- Terapkan filter (pengurutan per halaman di show_paged_table) -
+        filtered = range_summary[
+            (range_summary['Revenue'] >= min_rev) &
+            (range_summary['Profit'] >= min_pro) &
+            (range_summary['Profit Margin %'] >= min_mar)
+        ]
 
         # --- Ringkasan filter saat ini ----------------------------------
         col_sum1, col_sum2, col_sum3 = st.columns(3)
@@ -1386,14 +1444,9 @@ def main():
 
         # --- Tabel terformat --------------------------------------------
         if not filtered.empty:
-            display = filtered.copy()
-            for c in ['Revenue', 'Total Cost', 'Profit', 'Share 60%', 'Share 40%']:
-                if c in display.columns:
-                    display[c] = display[c].apply(lambda x: f"Rp {x:,.0f}")
-            display['Profit Margin %'] = display['Profit Margin %'].apply(lambda x: f"{x:.1f}%")
-
             st.markdown("#### 📋 Data Produk Terfilter")
-            st.dataframe(display, use_container_width=True, hide_index=True)
+            show_paged_table(filtered, 'filtered_products',
+                             sort_by='TotalQty' if sort_by == "Quantity" else sort_by)
         else:
             st.warning("🔍 Tidak ada produk yang memenuhi kriteria.")
 
@@ -1408,8 +1461,8 @@ def main():
             # Refund Analysis
             st.subheader("💸 Analisis Refund")
             
-            refund_df = income[income['Customer refund'] < 0]
-            refunded_ids = set(refund_df['Order/adjustment ID'].unique())
+            refund_df = derived['refunds']
+            refunded_ids = derived['refunded_ids']
             total_refund = refund_df['Customer refund'].sum()
 
             col1, col2, col3 = st.columns(3)
@@ -1424,18 +1477,17 @@ def main():
             if not refund_df.empty:
                 with st.expander("📋 Detail Order yang Di-refund"):
                     refund_display = refund_df[['Order/adjustment ID', 'Customer refund']].drop_duplicates()
-                    refund_display['Customer refund'] = refund_display['Customer refund'].apply(lambda x: f"Rp {abs(x):,.0f}")
-                    refund_display = refund_display.sort_values('Order/adjustment ID')
-                    st.dataframe(refund_display, use_container_width=True, hide_index=True)
+                    refund_display['Customer refund'] = refund_display['Customer refund'].abs()
+                    show_table(refund_display.sort_values('Order/adjustment ID'))
 
             st.divider()
 
             # Affiliate vs Store Analysis
             st.subheader("🤝 Analisis Affiliate vs Toko")
             
-            base = income[~income['Order/adjustment ID'].isin(refunded_ids)].copy()
-            aff = base[base['Affiliate commission'] < 0]
-            tok = base[base['Affiliate commission'] == 0]
+            base = derived['income_base']
+            aff = derived['affiliate']
+            tok = derived['store']
 
             def calc_metrics(df):
                 rev = df['Total settlement amount'].sum()
@@ -1494,33 +1546,29 @@ def main():
             # Order Source Table
             st.subheader("📊 Detail Sumber Order & Fee")
             
-            cols_show = ['Order/adjustment ID', 'Total revenue', 'Total settlement amount', 'Total fees']
-            commission_cols = ['Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']
-            cols_show.extend([c for c in commission_cols if c in base.columns])
+            order_sources = derived['order_sources']
 
-            # Prepare display data
-            aff_display = aff[cols_show].copy() if not aff.empty else pd.DataFrame()
-            tok_display = tok[cols_show].copy() if not tok.empty else pd.DataFrame()
-            
-            if not aff_display.empty:
-                aff_display['Sumber'] = '🤝 Affiliate'
-            if not tok_display.empty:
-                tok_display['Sumber'] = '🏪 Toko'
+            if not order_sources.empty:
+                # Total per sumber dari agregat yang sudah dihitung, bukan dari tabel tampilan
+                show_table(derived['order_source_totals'].reset_index())
 
-            if not aff_display.empty or not tok_display.empty:
-                df_orders = pd.concat([aff_display, tok_display], ignore_index=True)
-                
-                # Format currency columns
-                currency_cols = [c for c in df_orders.columns if c in ['Total settlement amount', 'Total fees', 'Total revenue', 'Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']]
-                for c in currency_cols:
-                    df_orders[c] = df_orders[c].apply(lambda x: f"Rp {abs(x):,.0f}")
+                col1, col2, col3 = st.columns([2, 1, 1])
+                with col1:
+                    search_term = st.text_input("🔍 Cari Order ID:", placeholder="Masukkan Order ID untuk pencarian...")
+                with col2:
+                    source_filter = st.selectbox("🏷️ Sumber", ["Semua", "🤝 Affiliate", "🏪 Toko"])
+                with col3:
+                    order_sort = st.selectbox("📊 Urutkan berdasarkan",
+                                              ["Order/adjustment ID"] + list(order_sources.columns[1:-1]),
+                                              key='order_sort')
 
-                # Add search functionality
-                search_term = st.text_input("🔍 Cari Order ID:", placeholder="Masukkan Order ID untuk pencarian...")
                 if search_term:
-                    df_orders = df_orders[df_orders['Order/adjustment ID'].astype(str).str.contains(search_term, case=False, na=False)]
-                
-                st.dataframe(df_orders, use_container_width=True, hide_index=True)
+                    order_sources = order_sources.iloc[get_order_id_index().search(search_term)]
+                if source_filter != "Semua":
+                    order_sources = order_sources[order_sources['Sumber'] == source_filter]
+
+                show_paged_table(order_sources, 'order_sources', sort_by=order_sort,
+                                 ascending=order_sort == "Order/adjustment ID")
             else:
                 st.info("ℹ️ Tidak ada data order yang tersedia untuk ditampilkan")
 
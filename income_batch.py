@@ -0,0 +1,276 @@
+"""Job batch tanpa Streamlit: proses ekspor pesanan & pendapatan lalu tulis laporan Excel.
+
+Contoh (cron):
+
+    python income_batch.py --costs biaya.json --output-dir laporan \\
+        --job toko-a/2025-01 pesanan_a.xlsx pendapatan_a.xlsx \\
+        --job toko-b/2025-01 pesanan_b.csv pendapatan_b.csv
+
+Daftar job juga bisa diberikan lewat --manifest berupa CSV dengan kolom
+name, orders, income. Job dijalankan paralel di ProcessPoolExecutor
+(--workers, default jumlah core) dan ringkasan lintas toko ditulis ke
+income_batch_summary.csv, metrik Detail Data (refund, affiliate vs toko,
+komisi) per job ke income_batch_detail.csv.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from cost_backends import (
+    DEFAULT_SHEET_ID, DEFAULT_SHEET_NAME, GoogleSheetCostBackend, JsonCostBackend, records_to_costs
+)
+from ingest import (
+    ORDER_DATE, ORDER_KEY, detect_format, read_income, read_orders, unparsed_order_dates,
+    with_order_date
+)
+from pipeline import REPORT_FORMATS, REPORT_SECTIONS, IncomePipeline
+from store import AnalyticsStore, infer_period
+from streaming import IncomeAggregator, aggregate_income
+
+
+def load_jobs(args):
+    """Gabungkan job dari --job dan --manifest menjadi daftar (nama, pesanan, pendapatan)"""
+    jobs = [tuple(job) for job in args.job or []]
+    if args.manifest:
+        base_dir = os.path.dirname(os.path.abspath(args.manifest))
+        with open(args.manifest, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                jobs.append((
+                    row['name'],
+                    os.path.join(base_dir, row['orders']),
+                    os.path.join(base_dir, row['income']),
+                ))
+    return jobs
+
+
+def load_costs(args):
+    """Muat biaya sekali dari file JSON atau Google Sheets"""
+    if args.costs:
+        backend = JsonCostBackend(args.costs)
+    else:
+        with open(args.credentials, encoding='utf-8') as f:
+            credentials_info = json.load(f)
+        backend = GoogleSheetCostBackend(credentials_info, args.sheet_id, args.sheet_name)
+    return records_to_costs(backend.fetch_records())
+
+
+def report_path(output_dir, name, fmt='excel'):
+    """Nama file laporan dari nama job (mis. toko-a/2025-01 -> income_report_toko-a_2025-01.xlsx)"""
+    safe_name = name.replace('/', '_').replace('\\', '_')
+    extension, _ = REPORT_FORMATS[fmt]
+    return os.path.join(output_dir, f"income_report_{safe_name}.{extension}")
+
+
+def split_job_name(name, order_dates):
+    """Nama job 'toko/periode' -> (toko, periode); tanpa '/', periode diambil dari tanggal order"""
+    if '/' in name:
+        shop, period = name.split('/', 1)
+        return shop, period
+    return name, infer_period(order_dates)
+
+
+def run_job(pipeline, name, orders_path, income_path, cost_data, output_dir, chunksize=None,
+            store_dir=None, report_format='excel', sections=None):
+    """Proses satu pasangan file dan tulis laporannya; kembalikan path, metrik utama & detail.
+
+    Dengan chunksize, file pendapatan dibaca per potongan ke IncomeAggregator
+    sehingga hanya satu baris per order yang tersimpan di memori. Metrik
+    detail (refund, affiliate vs toko, komisi) selalu dihitung lewat
+    IncomeAggregator. Dengan store_dir, hasilnya juga diarsipkan per toko/periode;
+    dengan chunksize frame pendapatan diarsipkan sebagai 'income_first_rows'.
+    """
+    pesanan_data = read_orders(orders_path, fmt=detect_format(orders_path))
+    if chunksize:
+        aggregator = aggregate_income(income_path, fmt=detect_format(income_path), chunksize=chunksize)
+        income_data = aggregator.income_first_rows()
+    else:
+        income_data = read_income(income_path, fmt=detect_format(income_path))
+        aggregator = IncomeAggregator()
+        aggregator.add(income_data)
+
+    merged, summary = pipeline.process_data(pesanan_data, income_data, cost_data)
+    if merged is None:
+        raise ValueError("Tidak ditemukan data yang cocok")
+
+    # Tanggal order diparsing sekali di sini; laporan & periode memakai kolom yang sama
+    derived = {'unique_orders': with_order_date(merged.drop_duplicates(subset=[ORDER_KEY]))}
+    unparsed = unparsed_order_dates(derived['unique_orders'])
+    if not unparsed.empty:
+        print(f"⚠️ {name}: {len(unparsed)} order dengan tanggal tidak terbaca", file=sys.stderr)
+    report = pipeline.create_report(merged, summary, cost_data, derived, fmt=report_format,
+                                    sections=sections)
+
+    path = report_path(output_dir, name, report_format)
+    with open(path, 'wb') as f:
+        f.write(report.getvalue())
+
+    totals = pipeline.compute_totals(derived['unique_orders'], summary)
+    detail = detail_row(aggregator, derived['unique_orders'])
+    if store_dir:
+        shop, period = split_job_name(name, derived['unique_orders'][ORDER_DATE])
+        # Hasil agregasi hanya berisi baris pertama per order, jangan disimpan sebagai pendapatan lengkap
+        income_key = 'income_first_rows' if chunksize else 'income'
+        AnalyticsStore(store_dir).save(shop, period, {
+            'orders': pesanan_data,
+            income_key: income_data,
+            'merged': merged,
+            'summary': summary,
+        }, totals)
+    return path, totals, detail
+
+
+def detail_row(aggregator, unique_orders):
+    """Metrik tab Detail Data dari IncomeAggregator, diratakan menjadi satu baris"""
+    metrics = aggregator.detail_metrics()
+    clean_orders, clean_quantity = aggregator.clean_order_totals(unique_orders)
+    row = {
+        'Gross Revenue': metrics['gross_revenue'],
+        'Net Revenue': metrics['net_revenue'],
+        'Total Fees': metrics['total_fees'],
+        'Refund Orders': metrics['refund_orders'],
+        'Refund Total': abs(metrics['refund_total']),
+        'Refund Rate %': round(metrics['refund_rate'], 2),
+        'Clean Orders': clean_orders,
+        'Clean Quantity': clean_quantity,
+    }
+    for source, label in (('affiliate', 'Affiliate'), ('store', 'Store')):
+        row[f'{label} Orders'] = metrics[source]['count']
+        row[f'{label} Revenue'] = metrics[source]['revenue']
+        row[f'{label} Fees'] = metrics[source]['fees']
+        row[f'{label} Fee %'] = round(metrics[source]['fee_pct'], 2)
+    row.update(metrics['commissions'])
+    return row
+
+
+# Biaya dikirim sekali per proses worker lewat initializer, bukan per job
+_worker_costs = None
+
+
+def _init_worker(cost_data):
+    global _worker_costs
+    _worker_costs = cost_data
+
+
+def _run_job_in_worker(job, output_dir, chunksize, store_dir, report_format, sections):
+    name, orders_path, income_path = job
+    return run_job(IncomePipeline(), name, orders_path, income_path, _worker_costs, output_dir,
+                   chunksize, store_dir, report_format, sections)
+
+
+def run_jobs(jobs, cost_data, output_dir, workers, chunksize=None, store_dir=None,
+             report_format='excel', sections=None):
+    """Jalankan semua job (paralel jika workers > 1); hasilkan (nama, path, metrik, detail, error)"""
+    if workers <= 1 or len(jobs) <= 1:
+        pipeline = IncomePipeline()
+        for name, orders_path, income_path in jobs:
+            try:
+                path, totals, detail = run_job(pipeline, name, orders_path, income_path, cost_data,
+                                               output_dir, chunksize, store_dir, report_format,
+                                               sections)
+                yield name, path, totals, detail, None
+            except Exception as e:
+                yield name, None, None, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cost_data,)) as executor:
+        futures = {
+            executor.submit(_run_job_in_worker, job, output_dir, chunksize, store_dir,
+                            report_format, sections): job[0]
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                path, totals, detail = future.result()
+                yield name, path, totals, detail, None
+            except Exception as e:
+                yield name, None, None, None, e
+
+
+def write_consolidated_summary(results, output_dir):
+    """Ringkasan lintas toko/periode, satu baris per job + baris TOTAL"""
+    summary = pd.DataFrame([{'Job': name, **totals} for name, totals in results]).sort_values('Job')
+    total = summary.drop(columns=['Job']).sum(numeric_only=True)
+    total['Profit Margin %'] = (
+        round(total['Profit'] / total['Total Revenue'] * 100, 2) if total['Total Revenue'] > 0 else 0
+    )
+    summary = pd.concat([summary, pd.DataFrame([{'Job': 'TOTAL', **total.to_dict()}])], ignore_index=True)
+    summary = summary.astype({'Total Orders': 'int64', 'Total Quantity': 'int64'})
+
+    path = os.path.join(output_dir, 'income_batch_summary.csv')
+    summary.to_csv(path, index=False)
+    return path
+
+
+def write_detail_summary(details, output_dir):
+    """Metrik Detail Data (refund, affiliate vs toko, komisi) satu baris per job"""
+    detail = pd.DataFrame([{'Job': name, **row} for name, row in details]).sort_values('Job')
+    path = os.path.join(output_dir, 'income_batch_detail.csv')
+    detail.to_csv(path, index=False)
+    return path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Proses laporan pendapatan tanpa antarmuka Streamlit")
+    parser.add_argument('--job', nargs=3, action='append', metavar=('NAME', 'ORDERS', 'INCOME'),
+                        help="Nama job (mis. toko/periode), file pesanan, dan file pendapatan")
+    parser.add_argument('--manifest', help="CSV berisi kolom name, orders, income")
+    parser.add_argument('--output-dir', default='.', help="Folder tujuan laporan")
+    parser.add_argument('--costs', help="File JSON biaya {nama produk: biaya per unit}")
+    parser.add_argument('--credentials', help="File JSON service account untuk Google Sheets")
+    parser.add_argument('--sheet-id', default=DEFAULT_SHEET_ID)
+    parser.add_argument('--sheet-name', default=DEFAULT_SHEET_NAME)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Jumlah proses paralel (default: jumlah core)")
+    parser.add_argument('--chunksize', type=int,
+                        help="Baca file pendapatan per potongan N baris (untuk ekspor sangat besar)")
+    parser.add_argument('--store', help="Arsipkan hasil per toko/periode ke folder ini (lihat store.py)")
+    parser.add_argument('--format', choices=list(REPORT_FORMATS), default='excel',
+                        help="Format laporan: excel, atau zip berisi csv/parquet per lembar")
+    parser.add_argument('--sections', nargs='+', choices=REPORT_SECTIONS, metavar='SECTION',
+                        help="Hanya hitung & tulis bagian ini (default semua): "
+                             + ", ".join(f"'{name}'" for name in REPORT_SECTIONS))
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args)
+    if not jobs:
+        parser.error("berikan minimal satu --job atau --manifest")
+    if not args.costs and not args.credentials:
+        parser.error("berikan --costs atau --credentials sebagai sumber biaya")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    cost_data = load_costs(args)
+
+    failed = 0
+    results = []
+    details = []
+    for name, path, totals, detail, error in run_jobs(jobs, cost_data, args.output_dir, args.workers,
+                                                  args.chunksize, args.store, args.format,
+                                                  args.sections):
+        if error is None:
+            results.append((name, totals))
+            details.append((name, detail))
+            print(f"✅ {name}: {path}")
+        else:
+            failed += 1
+            print(f"❌ {name}: {error}", file=sys.stderr)
+
+    if results:
+        print(f"📊 Ringkasan: {write_consolidated_summary(results, args.output_dir)}")
+        print(f"🧾 Detail: {write_detail_summary(details, args.output_dir)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""Pembacaan file ekspor TikTok Shop (pesanan & pendapatan) dengan skema tetap.
+
+Hanya kolom yang dipakai aplikasi yang dimuat, dengan tipe data ringkas:
+kategori untuk status/SKU/produk, int32 untuk kuantitas, float64 untuk uang,
+dan string untuk ID pesanan.
+"""
+import io
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsional: CSV memakai engine C, Parquet tidak tersedia
+    pq = None
+
+# Kolom tanggal yang mungkin ada di salah satu file ekspor
+DATE_COLUMNS = [
+    'Order created time(UTC)', 'Order settled time(UTC)', 'Order creation time',
+    'Order Creation Time', 'Order creation date', 'Creation Time', 'Date',
+    'Order Date', 'Order created time', 'Created time', 'Created Time'
+]
+
+ORDER_SCHEMA = {
+    'Order ID': 'string',
+    'Order Status': 'category',
+    'Seller SKU': 'category',
+    'Product Name': 'category',
+    'Variation': 'category',
+    'Quantity': 'int32',
+}
+ORDER_REQUIRED = list(ORDER_SCHEMA)
+
+INCOME_SCHEMA = {
+    'Order/adjustment ID': 'string',
+    'Total settlement amount': 'float64',
+    'Total revenue': 'float64',
+    'Total fees': 'float64',
+    'Customer refund': 'float64',
+    'Affiliate commission': 'float64',
+    'Dynamic Commission': 'float64',
+    'TikTok Shop commission fee': 'float64',
+}
+INCOME_REQUIRED = ['Order/adjustment ID', 'Total settlement amount']
+
+
+# Kunci join int64 yang dibangun sekali saat file dimuat
+ORDER_KEY = 'order_key'
+
+# Tanggal order (datetime64) dari kolom tanggal data gabungan pesanan & pendapatan
+ORDER_DATE = 'order_date'
+
+
+class MissingColumnsError(ValueError):
+    """File ekspor tidak memiliki kolom wajib"""
+
+    def __init__(self, missing):
+        self.missing = missing
+        super().__init__(f"Kolom wajib tidak ditemukan: {', '.join(missing)}")
+
+
+def apply_schema(df, schema):
+    """Ubah kolom ke tipe data ringkas sesuai skema"""
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'int32':
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int32')
+        elif dtype == 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif dtype == 'string':
+            df[col] = df[col].astype('string').str.strip()
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def order_keys(ids):
+    """Kunci int64 untuk ID pesanan: ID angka diparsing langsung, ID lain di-hash (negatif).
+
+    Aturannya per nilai sehingga kedua file selalu berada di ruang kunci yang sama.
+    """
+    ids = ids.astype('string').str.strip()
+    numeric = ids.str.fullmatch(r'\d{1,18}').fillna(False).to_numpy(dtype=bool)
+    keys = np.empty(len(ids), dtype='int64')
+    keys[numeric] = ids[numeric].astype('int64').to_numpy()
+    if not numeric.all():
+        other = ids[~numeric].fillna('').to_numpy(dtype=object)
+        keys[~numeric] = -(pd.util.hash_array(other) >> np.uint64(1)).astype('int64') - 1
+    return pd.Series(keys, index=ids.index, name=ORDER_KEY)
+
+
+def with_order_key(df, id_column):
+    """Pastikan DataFrame memiliki kolom kunci join untuk kolom ID-nya"""
+    if ORDER_KEY not in df.columns:
+        df = df.assign(**{ORDER_KEY: order_keys(df[id_column])})
+    return df
+
+
+def parse_dates(values):
+    """Parsing satu kolom tanggal dengan format yang paling banyak berhasil.
+
+    Format diinferensi dari data (seperti pd.to_datetime biasa); urutan
+    hari/bulan baru dicoba jika urutan bulan/hari menggagalkan lebih banyak
+    baris, sehingga tanggal tahun/bulan/hari tidak pernah ditukar.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    with warnings.catch_warnings():
+        # Format campuran/tidak terinferensi: pandas memperingatkan per panggilan, hasilnya tetap dibandingkan
+        warnings.filterwarnings('ignore', message='Could not infer format', category=UserWarning)
+        warnings.filterwarnings('ignore', message='Parsing dates in', category=UserWarning)
+        candidates = [
+            pd.to_datetime(values, errors='coerce', dayfirst=dayfirst)
+            for dayfirst in (False, True)
+        ]
+    return min(candidates, key=lambda dates: dates.isna().sum())
+
+
+def date_columns(df):
+    return [c for c in DATE_COLUMNS if c in df.columns]
+
+
+def with_order_date(df):
+    """Pastikan DataFrame memiliki kolom tanggal order datetime64.
+
+    Kolom tanggal yang ada dipakai berurutan sesuai DATE_COLUMNS: tanggal
+    yang kosong/gagal diparsing diisi dari kolom berikutnya. Dipanggil pada
+    data gabungan agar kolom tanggal dari file pendapatan ikut terpakai.
+    """
+    if ORDER_DATE in df.columns and df[ORDER_DATE].notna().any():
+        return df
+    dates = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for col in date_columns(df):
+        dates = dates.fillna(parse_dates(df[col]))
+    return df.assign(**{ORDER_DATE: dates})
+
+
+def unparsed_order_dates(df):
+    """Baris yang punya nilai tanggal tetapi tidak satu pun bisa diparsing"""
+    if ORDER_DATE not in df.columns:
+        df = with_order_date(df)
+    raw = df[date_columns(df)]
+    has_value = raw.notna() & (raw.astype('string').apply(lambda col: col.str.strip()) != '')
+    return df[has_value.any(axis=1).to_numpy() & df[ORDER_DATE].isna().to_numpy()]
+
+
+def detect_format(filename):
+    """Tentukan format file dari ekstensinya: excel, csv, atau parquet"""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    return 'excel'
+
+
+def select_columns(raw_columns, schema, required):
+    """Petakan nama kolom mentah ke nama bersih yang dibutuhkan skema"""
+    wanted = set(schema) | set(DATE_COLUMNS)
+    columns = {raw: str(raw).strip() for raw in raw_columns if str(raw).strip() in wanted}
+    missing = [c for c in required if c not in columns.values()]
+    if missing:
+        raise MissingColumnsError(missing)
+    return columns
+
+
+def id_dtypes(columns, schema):
+    """ID dibaca sebagai teks agar angka panjang tidak berubah menjadi float"""
+    return {raw: str for raw, col in columns.items() if schema.get(col) == 'string'}
+
+
+def read_excel_export(source, schema, required, header=0, skiprows=None):
+    """Baca Excel hanya dengan kolom skema + kolom tanggal"""
+    with pd.ExcelFile(source) as xl:
+        # Baca header dulu (workbook hanya dibuka sekali) untuk memetakan nama kolom mentah
+        raw_columns = xl.parse(header=header, skiprows=skiprows, nrows=0).columns
+        columns = select_columns(raw_columns, schema, required)
+        df = xl.parse(header=header, skiprows=skiprows, usecols=list(columns),
+                      dtype=id_dtypes(columns, schema))
+    df = df.rename(columns=columns)
+    return apply_schema(df, schema)
+
+
+def read_csv_export(source, schema, required, header=0, skiprows=None):
+    """Baca CSV dengan kolom skema; engine pyarrow dipakai jika tersedia"""
+    raw_columns = pd.read_csv(source, header=header, nrows=0).columns
+    columns = select_columns(raw_columns, schema, required)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    engine = 'pyarrow' if pq is not None else 'c'
+    df = pd.read_csv(source, header=header, usecols=list(columns),
+                     dtype=id_dtypes(columns, schema), engine=engine)
+    if skiprows:
+        # Engine pyarrow tidak mendukung skiprows berupa daftar; buang barisnya setelah dibaca
+        drop_pos = [r - header - 1 for r in skiprows if r > header]
+        df = df.drop(index=df.index[drop_pos]).reset_index(drop=True)
+    df = df.rename(columns=columns)
+    return apply_schema(df, schema)
+
+
+def read_parquet_export(source, schema, required):
+    """Baca Parquet (mis. hasil konversi dari Excel) hanya dengan kolom skema"""
+    if pq is None:
+        raise ImportError("pyarrow diperlukan untuk membaca file Parquet")
+    raw_columns = pq.ParquetFile(source).schema_arrow.names
+    columns = select_columns(raw_columns, schema, required)
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    df = pd.read_parquet(source, columns=list(columns))
+    df = df.rename(columns=columns)
+    return apply_schema(df, schema)
+
+
+def read_export(source, schema, required, fmt='excel', header=0, skiprows=None):
+    """Baca file ekspor sesuai formatnya"""
+    if fmt == 'csv':
+        return read_csv_export(source, schema, required, header=header, skiprows=skiprows)
+    if fmt == 'parquet':
+        # Parquet sudah berisi data bersih tanpa baris deskripsi
+        return read_parquet_export(source, schema, required)
+    return read_excel_export(source, schema, required, header=header, skiprows=skiprows)
+
+
+def read_orders(source, fmt='excel'):
+    """Baca ekspor pesanan (baris ke-2 berisi deskripsi kolom dan dilewati)"""
+    df = read_export(source, ORDER_SCHEMA, ORDER_REQUIRED, fmt=fmt, header=0, skiprows=[1])
+    return with_order_key(df, 'Order ID')
+
+
+def read_income(source, fmt='excel'):
+    """Baca ekspor pendapatan/settlement"""
+    df = read_export(source, INCOME_SCHEMA, INCOME_REQUIRED, fmt=fmt)
+    return with_order_key(df, 'Order/adjustment ID')
+
+
+def _prepare_chunk(df, columns, schema, id_column):
+    df = df.rename(columns=columns)
+    return with_order_key(apply_schema(df, schema), id_column)
+
+
+def iter_export_chunks(source, schema, required, id_column, fmt='excel', chunksize=50_000,
+                       header=0, skiprows=None):
+    """Baca file ekspor per potongan (chunk) agar memori tidak bergantung jumlah baris.
+
+    Excel dibaca dengan openpyxl mode read-only baris demi baris, CSV dengan
+    chunksize pandas, dan Parquet per record batch.
+    """
+    if fmt == 'csv':
+        raw_columns = pd.read_csv(source, header=header, nrows=0).columns
+        columns = select_columns(raw_columns, schema, required)
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        reader = pd.read_csv(source, header=header, skiprows=skiprows, usecols=list(columns),
+                             dtype=id_dtypes(columns, schema), chunksize=chunksize)
+        for chunk in reader:
+            yield _prepare_chunk(chunk, columns, schema, id_column)
+        return
+
+    if fmt == 'parquet':
+        if pq is None:
+            raise ImportError("pyarrow diperlukan untuk membaca file Parquet")
+        parquet_file = pq.ParquetFile(source)
+        columns = select_columns(parquet_file.schema_arrow.names, schema, required)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=list(columns)):
+            yield _prepare_chunk(batch.to_pandas(), columns, schema, id_column)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        # Lembar pertama, sama seperti pd.read_excel di read_excel_export (bukan lembar aktif)
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        skip = set(skiprows or [])
+        raw_columns = []
+        for row_num, row in enumerate(rows):
+            if row_num == header:
+                raw_columns = list(row)
+                break
+        raw_names = [str(c) if c is not None else '' for c in raw_columns]
+        columns = select_columns(raw_names, schema, required)
+        positions = [i for i, name in enumerate(raw_names) if name in columns]
+        names = [raw_names[i] for i in positions]
+        # Sel ID berupa angka: float bulat jadi int seperti pd.read_excel(dtype=str)
+        id_positions = [j for j, name in enumerate(names) if schema.get(columns[name]) == 'string']
+
+        buffer = []
+        for row_num, row in enumerate(rows, start=header + 1):
+            if row_num in skip:
+                continue
+            values = [row[i] if i < len(row) else None for i in positions]
+            for j in id_positions:
+                if isinstance(values[j], float) and values[j].is_integer():
+                    values[j] = int(values[j])
+            buffer.append(values)
+            if len(buffer) >= chunksize:
+                yield _prepare_chunk(pd.DataFrame(buffer, columns=names), columns, schema, id_column)
+                buffer = []
+        if buffer:
+            yield _prepare_chunk(pd.DataFrame(buffer, columns=names), columns, schema, id_column)
+    finally:
+        workbook.close()
+
+
+def iter_income_chunks(source, fmt='excel', chunksize=50_000):
+    """Baca ekspor pendapatan per potongan"""
+    return iter_export_chunks(source, INCOME_SCHEMA, INCOME_REQUIRED, 'Order/adjustment ID',
+                              fmt=fmt, chunksize=chunksize)
+
+
+def to_parquet_bytes(df):
+    """Serialisasi DataFrame hasil parsing ke Parquet agar analisis ulang tidak perlu Excel"""
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
@@ -0,0 +1,625 @@
+"""Pipeline pengolahan data pesanan & pendapatan tanpa ketergantungan Streamlit.
+
+Dipakai oleh aplikasi Streamlit (income.py) maupun job batch (income_batch.py).
+"""
+import hashlib
+import io
+import zipfile
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from ingest import ORDER_DATE, ORDER_KEY, unparsed_order_dates, with_order_date, with_order_key
+
+
+def frame_fingerprint(df):
+    """Sidik jari isi DataFrame (kolom + semua baris) untuk kunci cache"""
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(repr(list(df.columns)).encode())
+    return digest.hexdigest()
+
+
+def page_rows(df, page, page_size, sort_by=None, ascending=False):
+    """Baris satu halaman (page mulai 0); untuk halaman awal cukup diurutkan sebagian"""
+    start = page * page_size
+    stop = start + page_size
+    if sort_by is None:
+        return df.iloc[start:stop]
+    # Halaman awal: ambil `stop` baris teratas saja (nlargest/nsmallest, tanpa sort penuh)
+    values = df[sort_by]
+    if stop <= len(df) // 4 and pd.api.types.is_numeric_dtype(values) and values.notna().all():
+        top = df.nsmallest(stop, sort_by) if ascending else df.nlargest(stop, sort_by)
+        return top.iloc[start:]
+    return df.sort_values(sort_by, ascending=ascending, kind='stable').iloc[start:stop]
+
+
+# Kolom tabel sumber order (Detail Data); nilai uang ditampilkan absolut
+ORDER_SOURCE_COLUMNS = [
+    'Order/adjustment ID', 'Total revenue', 'Total settlement amount', 'Total fees',
+    'Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee',
+]
+
+# Kunci produk kubus harian; sama dengan kunci summary_data agar ringkasan rentang sebanding
+CUBE_KEYS = ['Seller SKU', 'Product Name', 'Variation']
+
+
+# Format laporan: ekstensi file & tipe MIME
+REPORT_FORMATS = {
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('zip', 'application/zip'),
+    'parquet': ('zip', 'application/zip'),
+}
+
+
+# Bagian laporan sesuai urutan lembar; 'Ringkasan' adalah lembar metrik utama
+REPORT_SECTIONS = (
+    'Ringkasan', 'Ringkasan per Produk', 'Ringkasan per SKU',
+    'Penjualan Harian', 'Produk Teratas', 'Daftar Biaya Produk',
+)
+
+# Perkiraan porsi waktu untuk menghitung isi laporan (sisanya untuk menulis lembar)
+REPORT_COMPUTE_SHARE = 0.3
+
+
+def _no_progress(fraction, label):
+    pass
+
+
+def _is_date_column(values):
+    """Kolom datetime64 atau kolom objek berisi tanggal (mis. Order Date harian)"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return True
+    first = values.dropna().head(1)
+    return not first.empty and isinstance(first.iloc[0], date)
+
+
+class IncomePipeline:
+    """Penggabungan data, perhitungan biaya/profit, dan laporan Excel"""
+
+    def get_product_cost(self, product_name, cost_data):
+        """Mendapatkan biaya produk dari data biaya"""
+        return float(cost_data.get(product_name, 0.0))
+    
+    def lookup_costs(self, product_names, cost_data):
+        """Biaya per unit untuk satu kolom nama produk sekaligus (0 jika belum diatur)"""
+        return product_names.astype('string').map(cost_data).fillna(0.0).astype('float64')
+    
+    def missing_cost_products(self, product_names, cost_data):
+        """Daftar nama produk yang belum memiliki biaya"""
+        names = product_names.dropna().astype(str).unique()
+        return sorted(name for name in names if name not in cost_data)
+    
+    def build_sales_summary(self, pesanan_data, income_data):
+        """Menggabungkan data dan meringkas penjualan per produk (tanpa biaya)"""
+        # Kunci join int64 (sudah dibuat saat file dimuat)
+        pesanan_data = with_order_key(pesanan_data, 'Order ID')
+        income_data = with_order_key(income_data, 'Order/adjustment ID')
+        
+        # Filter pesanan selesai
+        df1 = pesanan_data[pesanan_data['Order Status'] == 'Selesai']
+        
+        # Hapus duplikat dari data pendapatan
+        df2 = income_data.drop_duplicates(subset=[ORDER_KEY])
+        
+        # Gabungkan data
+        merged = pd.merge(df1, df2, on=ORDER_KEY, how='inner')
+
+        unique_orders = merged.drop_duplicates(subset=[ORDER_KEY])
+        
+        if merged.empty:
+            return None, None
+        
+        # Buat ringkasan
+        group_keys = ['Seller SKU', 'Product Name', 'Variation']
+        summary = unique_orders.groupby(group_keys, as_index=False, observed=True).agg(
+            TotalQty=('Quantity', 'sum'),
+            Revenue=('Total settlement amount', 'sum')
+        )
+        summary[group_keys] = summary[group_keys].astype(str)
+        
+        return merged, summary
+    
+    def apply_costs(self, summary, cost_data):
+        """Menambahkan kolom biaya & profit ke ringkasan penjualan"""
+        summary = summary.copy()
+        summary['Cost per Unit'] = self.lookup_costs(summary['Product Name'], cost_data)
+        summary['Total Cost'] = summary['TotalQty'] * summary['Cost per Unit']
+        summary['Profit'] = summary['Revenue'] - summary['Total Cost']
+        summary['Profit Margin %'] = (summary['Profit'] / summary['Revenue'] * 100).round(2)
+        summary['Share 60%'] = summary['Profit'] * 0.6
+        summary['Share 40%'] = summary['Profit'] * 0.4
+        return summary
+    
+    def process_data(self, pesanan_data, income_data, cost_data):
+        """Memproses dan menggabungkan data"""
+        merged, summary = self.build_sales_summary(pesanan_data, income_data)
+        
+        if merged is None:
+            return None, None
+        
+        return merged, self.apply_costs(summary, cost_data)
+    
+    def upsert_rows(self, existing, new_rows):
+        """Ganti semua baris lama yang kuncinya ada di new_rows, lalu tambahkan new_rows"""
+        keep = existing[~existing[ORDER_KEY].isin(new_rows[ORDER_KEY].unique())]
+        return pd.concat([keep, new_rows], ignore_index=True)
+    
+    def apply_increment(self, pesanan_data, income_data, merged_data, summary_data,
+                        new_orders, new_income, cost_data):
+        """Gabungkan pesanan/pendapatan baru ke hasil yang sudah diproses.
+
+        Hanya order yang muncul di data baru yang digabung ulang; ringkasan
+        diperbarui dengan selisih (kontribusi lama dikurangi, yang baru
+        ditambahkan) tanpa groupby ulang seluruh data.
+        Mengembalikan (pesanan_data, income_data, merged, summary).
+        """
+        group_keys = ['Seller SKU', 'Product Name', 'Variation']
+        new_orders = with_order_key(new_orders, 'Order ID')
+        new_income = with_order_key(new_income, 'Order/adjustment ID')
+        affected = np.union1d(new_orders[ORDER_KEY].unique(), new_income[ORDER_KEY].unique())
+        
+        pesanan_data = self.upsert_rows(with_order_key(pesanan_data, 'Order ID'), new_orders)
+        income_data = self.upsert_rows(with_order_key(income_data, 'Order/adjustment ID'), new_income)
+        
+        # Gabung ulang hanya order yang terdampak
+        merged_delta, delta_summary = self.build_sales_summary(
+            pesanan_data[pesanan_data[ORDER_KEY].isin(affected)],
+            income_data[income_data[ORDER_KEY].isin(affected)]
+        )
+        
+        # Kontribusi lama order terdampak
+        is_affected = merged_data[ORDER_KEY].isin(affected)
+        old_orders = merged_data[is_affected].drop_duplicates(subset=[ORDER_KEY])
+        old_summary = old_orders.groupby(group_keys, as_index=False, observed=True).agg(
+            TotalQty=('Quantity', 'sum'),
+            Revenue=('Total settlement amount', 'sum')
+        )
+        old_summary[group_keys] = old_summary[group_keys].astype(str)
+        
+        base = summary_data.set_index(group_keys)[['TotalQty', 'Revenue']]
+        updated = base.sub(old_summary.set_index(group_keys), fill_value=0)
+        if delta_summary is not None:
+            updated = updated.add(delta_summary.set_index(group_keys), fill_value=0)
+        
+        # Produk yang tidak lagi memiliki order dihapus dari ringkasan
+        touched = updated.index.isin(old_summary.set_index(group_keys).index)
+        updated = updated[~(touched & (updated['TotalQty'] == 0))].sort_index()
+        summary = updated.reset_index()
+        summary['TotalQty'] = summary['TotalQty'].astype(base['TotalQty'].dtype)
+        
+        merged = pd.concat(
+            [merged_data[~is_affected]] + ([merged_delta] if merged_delta is not None else []),
+            ignore_index=True
+        )
+        
+        return pesanan_data, income_data, merged, self.apply_costs(summary, cost_data)
+    
+    def build_daily_cube(self, unique_orders):
+        """Kubus harian: satu baris per (hari, SKU, produk, variasi) berisi kuantitas, order & pendapatan.
+
+        Setiap order unik bertanggal masuk tepat satu sel, sehingga semua kolom
+        bisa dijumlahkan untuk rentang tanggal atau SKU mana pun. Order tanpa
+        tanggal tidak masuk kubus.
+        """
+        if ORDER_DATE not in unique_orders.columns:
+            unique_orders = with_order_date(unique_orders)
+        dated = unique_orders[unique_orders[ORDER_DATE].notna()]
+        cube = (
+            dated.assign(Date=dated[ORDER_DATE].dt.normalize())
+            .groupby(['Date'] + CUBE_KEYS, as_index=False, observed=True, dropna=False)
+            .agg(
+                Quantity=('Quantity', 'sum'),
+                Orders=(ORDER_KEY, 'size'),
+                Revenue=('Total settlement amount', 'sum')
+            )
+        )
+        cube[CUBE_KEYS] = cube[CUBE_KEYS].astype(str)
+        return cube
+    
+    def cube_with_costs(self, cube, cost_data):
+        """Tambahkan kolom biaya ke kubus harian (murah: ukuran kubus, bukan jumlah order)"""
+        return cube.assign(Cost=cube['Quantity'] * self.lookup_costs(cube['Product Name'], cost_data))
+    
+    def cube_date_range(self, cube):
+        """Tanggal pertama & terakhir di kubus, atau (None, None) jika tidak ada tanggal"""
+        if cube.empty:
+            return None, None
+        return cube['Date'].min(), cube['Date'].max()
+    
+    def slice_cube(self, cube, start=None, end=None):
+        """Baris kubus dalam rentang tanggal [start, end]; kubus sudah terurut per tanggal"""
+        dates = cube['Date']
+        lo = 0 if start is None else dates.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(cube) if end is None else dates.searchsorted(pd.Timestamp(end), side='right')
+        return cube.iloc[lo:hi]
+    
+    def previous_range(self, start, end):
+        """Rentang dengan panjang yang sama tepat sebelum [start, end]"""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        prev_end = start - pd.Timedelta(days=1)
+        return prev_end - (end - start), prev_end
+    
+    def cube_totals(self, cube):
+        """Metrik utama dari potongan kubus berbiaya (kunci sama dengan compute_totals)"""
+        total_revenue = cube['Revenue'].sum()
+        total_cost = cube['Cost'].sum()
+        total_profit = total_revenue - total_cost
+        return {
+            'Total Orders': int(cube['Orders'].sum()),
+            'Total Quantity': cube['Quantity'].sum(),
+            'Total Revenue': total_revenue,
+            'Total Cost': total_cost,
+            'Profit': total_profit,
+            'Profit Margin %': round(total_profit / total_revenue * 100, 2) if total_revenue > 0 else 0,
+            'Share 60%': total_profit * 0.6,
+            'Share 40%': total_profit * 0.4,
+        }
+    
+    def cube_product_summary(self, cube, cost_data):
+        """Ringkasan per SKU, produk & variasi dari potongan kubus, dengan kolom seperti summary_data"""
+        summary = (
+            cube.groupby(CUBE_KEYS, as_index=False)
+            .agg(TotalQty=('Quantity', 'sum'), Revenue=('Revenue', 'sum'))
+        )
+        return self.apply_costs(summary, cost_data)
+    
+    def daily_sales(self, cube):
+        """Penjualan per hari dari kubus harian"""
+        daily = (
+            cube.groupby('Date', as_index=False)
+            .agg(
+                Daily_Quantity=('Quantity', 'sum'),
+                Daily_Orders=('Orders', 'sum'),
+                Daily_Revenue=('Revenue', 'sum')
+            )
+        )
+        return daily.assign(Date=daily['Date'].dt.date).rename(columns={'Date': 'Order Date'})
+    
+    def build_derived_data(self, merged_data, income_data):
+        """Turunan data yang dipakai banyak tampilan, dihitung sekali per dataset"""
+        unique_orders = with_order_date(merged_data.drop_duplicates(subset=[ORDER_KEY]))
+        income_data = with_order_key(income_data, 'Order/adjustment ID')
+        
+        # Kolom refund/affiliate opsional; anggap 0 jika tidak ada di file
+        no_value = pd.Series(0.0, index=income_data.index)
+        refund = income_data.get('Customer refund', no_value)
+        affiliate = income_data.get('Affiliate commission', no_value)
+        income_keys = income_data[ORDER_KEY]
+        
+        refunds = income_data[refund < 0]
+        refunded_ids = set(refunds['Order/adjustment ID'].unique())
+        refunded_keys = refunds[ORDER_KEY].unique()
+        
+        # Order selesai yang punya baris pendapatan non-refund
+        non_refund_keys = income_keys[refund >= 0].unique()
+        clean_orders = unique_orders[unique_orders[ORDER_KEY].isin(non_refund_keys)]
+        
+        not_refunded = ~income_keys.isin(refunded_keys)
+        income_base = income_data[not_refunded]
+        
+        affiliate_orders = income_base[affiliate[not_refunded] < 0]
+        store_orders = income_base[affiliate[not_refunded] == 0]
+        order_sources = self.build_order_sources(affiliate_orders, store_orders)
+        
+        return {
+            'unique_orders': unique_orders,
+            'daily_cube': self.build_daily_cube(unique_orders),
+            'unparsed_dates': unparsed_order_dates(unique_orders),
+            'clean_orders': clean_orders,
+            'refunds': refunds,
+            'refunded_ids': refunded_ids,
+            'income_base': income_base,
+            'affiliate': affiliate_orders,
+            'store': store_orders,
+            'order_sources': order_sources,
+            'order_source_totals': order_sources.drop(columns=['Order/adjustment ID'])
+                                                .groupby('Sumber', sort=False).sum(),
+        }
+    
+    def build_order_sources(self, affiliate_orders, store_orders):
+        """Tabel order affiliate + toko dengan kolom Sumber, nilai uang absolut"""
+        columns = [c for c in ORDER_SOURCE_COLUMNS if c in affiliate_orders.columns]
+        order_sources = pd.concat([
+            affiliate_orders[columns].assign(Sumber='🤝 Affiliate'),
+            store_orders[columns].assign(Sumber='🏪 Toko'),
+        ], ignore_index=True)
+        money_columns = columns[1:]
+        order_sources[money_columns] = order_sources[money_columns].abs()
+        return order_sources
+    
+    def compute_totals(self, unique_orders, summary_data):
+        """Metrik utama satu dataset: pesanan, kuantitas, pendapatan, biaya, profit"""
+        total_orders = unique_orders['Order ID'].nunique()
+        total_revenue = unique_orders['Total settlement amount'].sum()
+        total_cost = summary_data['Total Cost'].sum()
+        total_profit = total_revenue - total_cost
+        return {
+            'Total Orders': total_orders,
+            'Total Quantity': unique_orders['Quantity'].sum(),
+            'Total Revenue': total_revenue,
+            'Total Cost': total_cost,
+            'Profit': total_profit,
+            'Profit Margin %': round(total_profit / total_revenue * 100, 2) if total_revenue > 0 else 0,
+            'Share 60%': total_profit * 0.6,
+            'Share 40%': total_profit * 0.4,
+        }
+    
+    def report_sku_summary(self, unique_orders, merged_data, cost_data):
+        """Ringkasan per SKU dengan biaya dari nama produk pertama tiap SKU"""
+        summary_by_sku = (
+            unique_orders.groupby('Seller SKU', as_index=False, observed=True)
+            .agg({
+                'Quantity': 'sum',
+                'Order ID': 'nunique',
+                'Total settlement amount': 'sum'
+            })
+            .rename(columns={
+                'Quantity': 'Total Quantity',
+                'Order ID': 'Total Orders',
+                'Total settlement amount': 'Total Revenue'
+            })
+        )
+        
+        # Dapatkan nama produk pertama untuk setiap SKU
+        # Kunci SKU dijadikan teks di kedua sisi (SKU angka mis. 1001 tetap cocok)
+        summary_by_sku['Seller SKU'] = summary_by_sku['Seller SKU'].astype(str)
+        sku_products = merged_data.groupby('Seller SKU', observed=True)['Product Name'].first().astype(str)
+        sku_products.index = sku_products.index.astype(str)
+        summary_by_sku['Cost per Unit'] = self.lookup_costs(
+            summary_by_sku['Seller SKU'].map(sku_products), cost_data
+        )
+        summary_by_sku['Total Cost'] = summary_by_sku['Total Quantity'] * summary_by_sku['Cost per Unit']
+        summary_by_sku['Profit'] = summary_by_sku['Total Revenue'] - summary_by_sku['Total Cost']
+        summary_by_sku['Profit Margin %'] = (summary_by_sku['Profit'] / summary_by_sku['Total Revenue'] * 100).round(2)
+        summary_by_sku['Share 60%'] = summary_by_sku['Profit'] * 0.6
+        summary_by_sku['Share 40%'] = summary_by_sku['Profit'] * 0.4
+        return summary_by_sku
+    
+    def report_daily_sales(self, daily_cube):
+        """Lembar penjualan harian dari kubus harian"""
+        if daily_cube.empty:
+            return pd.DataFrame({
+                'Order Date': ['Kolom tanggal tidak ditemukan'],
+                'Daily Quantity': [0],
+                'Daily Orders': [0],
+                'Daily Revenue': [0]
+            })
+        return self.daily_sales(daily_cube)
+    
+    def report_top_products(self, unique_orders, cost_data):
+        """10 produk dengan profit tertinggi, diringkas bersih dari unique_orders"""
+        return (
+            unique_orders
+            .groupby('Product Name', as_index=False, observed=True)
+            .agg(
+                TotalQty=('Quantity', 'sum'),
+                Revenue=('Total settlement amount', 'sum')
+            )
+            .astype({'Product Name': str})
+            .assign(
+                Cost=lambda d: self.lookup_costs(d['Product Name'], cost_data),
+                Total_Cost=lambda d: d['TotalQty'] * d['Cost'],
+                Profit=lambda d: d['Revenue'] - d['Total_Cost'],
+                Profit_Margin=lambda d: (d['Profit'] / d['Revenue'] * 100).round(2)
+            )
+            .nlargest(10, 'Profit')
+        )
+    
+    def report_overview(self, unique_orders, total_cost, daily_cube):
+        """Baris lembar Ringkasan: (label, nilai, jenis format); None = baris kosong"""
+        total_orders  = unique_orders['Order ID'].nunique()
+        total_revenue = unique_orders['Total settlement amount'].sum()
+        total_qty     = unique_orders['Quantity'].sum()
+        total_profit = total_revenue - total_cost
+        
+        date_range_start, date_range_end = self.cube_date_range(daily_cube)
+        if date_range_start is None:
+            date_range_start = date_range_end = datetime.now()
+        
+        # Metrik tambahan
+        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
+        avg_profit_per_order = total_profit / total_orders if total_orders > 0 else 0
+        overall_profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
+        
+        return [
+            ('Periode:', f'{date_range_start.strftime("%d/%m/%Y")} - {date_range_end.strftime("%d/%m/%Y")}', 'text'),
+            ('Dibuat:', f'{datetime.now().strftime("%d %B %Y %H:%M")}', 'text'),
+            ('Total Pesanan:', total_orders, 'number'),
+            ('Total Kuantitas:', total_qty, 'number'),
+            ('Total Pendapatan:', total_revenue, 'currency'),
+            ('Total Biaya:', total_cost, 'currency'),
+            ('Total Profit:', total_profit, 'currency'),
+            ('Bagian 60%:', total_profit * 0.6, 'currency'),
+            ('Bagian 40%:', total_profit * 0.4, 'currency'),
+            None,  # baris kosong sebelum metrik tambahan
+            ('Nilai Rata-rata Pesanan:', avg_order_value, 'currency'),
+            ('Rata-rata Profit per Pesanan:', avg_profit_per_order, 'currency'),
+            ('Margin Profit Keseluruhan:', overall_profit_margin / 100, 'percent'),
+        ]
+    
+    def build_report_data(self, merged_data, summary_data, cost_data, derived=None, sections=None):
+        """Hitung isi laporan untuk bagian terpilih (default semua REPORT_SECTIONS).
+
+        Mengembalikan (baris Ringkasan atau None, {nama lembar: DataFrame}).
+        Bagian yang tidak dipilih tidak dihitung sama sekali.
+        """
+        sections = REPORT_SECTIONS if sections is None else sections
+        unknown = [name for name in sections if name not in REPORT_SECTIONS]
+        if unknown:
+            raise ValueError(f"Bagian laporan tidak dikenal: {', '.join(unknown)}")
+        if not sections:
+            raise ValueError("Pilih minimal satu bagian laporan")
+        
+        if derived is None:
+            derived = {'unique_orders': merged_data.drop_duplicates(subset=[ORDER_KEY])}
+        unique_orders = derived['unique_orders']
+        
+        daily_cube = None
+        if 'Ringkasan' in sections or 'Penjualan Harian' in sections:
+            daily_cube = derived.get('daily_cube')
+            if daily_cube is None:
+                daily_cube = self.build_daily_cube(unique_orders)
+        
+        # Total biaya di lembar Ringkasan dijumlahkan dari ringkasan per SKU
+        summary_by_sku = None
+        if 'Ringkasan' in sections or 'Ringkasan per SKU' in sections:
+            summary_by_sku = self.report_sku_summary(unique_orders, merged_data, cost_data)
+        
+        overview = None
+        if 'Ringkasan' in sections:
+            overview = self.report_overview(unique_orders, summary_by_sku['Total Cost'].sum(), daily_cube)
+        
+        sheets = {}
+        if 'Ringkasan per Produk' in sections:
+            sheets['Ringkasan per Produk'] = summary_data
+        if 'Ringkasan per SKU' in sections:
+            sheets['Ringkasan per SKU'] = summary_by_sku
+        if 'Penjualan Harian' in sections:
+            sheets['Penjualan Harian'] = self.report_daily_sales(daily_cube)
+        if 'Produk Teratas' in sections:
+            sheets['Produk Teratas'] = self.report_top_products(unique_orders, cost_data)
+        
+        # Daftar biaya produk
+        if 'Daftar Biaya Produk' in sections and cost_data:
+            cost_df = pd.DataFrame(list(cost_data.items()), columns=["Product Name", "Cost per Unit"])
+            sheets['Daftar Biaya Produk'] = cost_df.sort_values(by="Product Name")
+        
+        return overview, sheets
+    
+    def _write_table(self, worksheet, df, header_format, formats):
+        """Tulis DataFrame baris demi baris dengan write_row; format angka diatur per kolom"""
+        columns = []
+        for col_num, col in enumerate(df.columns):
+            values = df[col]
+            if pd.api.types.is_numeric_dtype(values):
+                fmt = formats['percent_number'] if 'Margin' in str(col) else formats['number']
+                # NaN/±inf (mis. margin produk tanpa pendapatan) ditulis sebagai sel kosong
+                numbers = values.astype('float64')
+                columns.append(numbers.astype(object).where(np.isfinite(numbers), None).tolist())
+            elif _is_date_column(values):
+                fmt = formats['date']
+                columns.append(values.astype(object).where(values.notna(), None).tolist())
+            else:
+                fmt = None
+                columns.append(values.astype(object).where(values.notna(), None).tolist())
+            worksheet.set_column(col_num, col_num, max(len(str(col)) + 2, 12), fmt)
+        
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+        for row_num, row in enumerate(zip(*columns), start=1):
+            worksheet.write_row(row_num, 0, row)
+    
+    def _write_overview(self, worksheet, overview, title_format, header_format, formats):
+        """Lembar Ringkasan; baris ditulis berurutan sesuai mode constant_memory"""
+        worksheet.set_column('A:B', 25)
+        worksheet.set_column('C:C', 20)
+        worksheet.merge_range('A1:C1', 'LAPORAN PENJUALAN & ANALISIS PROFIT', title_format)
+        
+        (period_label, period), (created_label, created) = overview[0][:2], overview[1][:2]
+        worksheet.write(2, 0, period_label, header_format)
+        worksheet.write(2, 1, period)
+        worksheet.write(3, 0, created_label, header_format)
+        worksheet.write(3, 1, created)
+        
+        row = 7
+        worksheet.write(row, 0, 'RINGKASAN PENJUALAN & PROFIT', header_format)
+        for item in overview[2:]:
+            row += 1
+            if item is None:
+                continue
+            label, value, kind = item
+            worksheet.write(row, 0, label)
+            if isinstance(value, (int, float, np.number)) and not np.isfinite(value):
+                value = None
+            worksheet.write(row, 1, value, formats[kind])
+    
+    def create_excel_report(self, merged_data, summary_data, cost_data, derived=None, progress=None,
+                            sections=None):
+        """Membuat laporan Excel.
+
+        Ditulis langsung dengan xlsxwriter mode constant_memory: setiap baris
+        dikirim ke file sementara begitu selesai, sehingga memori tidak
+        bertambah dengan jumlah baris lembar. progress(fraksi, keterangan)
+        opsional dipanggil di setiap tahap; sections membatasi lembar yang
+        dihitung & ditulis (lihat build_report_data).
+        """
+        progress = progress or _no_progress
+        progress(0.0, "Menghitung isi laporan")
+        overview, sheets = self.build_report_data(merged_data, summary_data, cost_data, derived, sections)
+        output = io.BytesIO()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        
+        # Tentukan format
+        title_format = workbook.add_format({
+            'bold': True, 'font_size': 16, 'align': 'center',
+            'bg_color': '#4472C4', 'font_color': 'white'
+        })
+        
+        header_format = workbook.add_format({
+            'bold': True, 'font_size': 12,
+            'bg_color': '#D9E2F3', 'border': 1
+        })
+        
+        formats = {
+            'currency': workbook.add_format({'num_format': '#,##0', 'border': 1}),
+            'number': workbook.add_format({'num_format': '#,##0'}),
+            'percent': workbook.add_format({'num_format': '0.00%', 'border': 1}),
+            'percent_number': workbook.add_format({'num_format': '0.00'}),
+            'date': workbook.add_format({'num_format': 'yyyy-mm-dd'}),
+        }
+        formats['text'] = None
+        
+        if overview is not None:
+            self._write_overview(workbook.add_worksheet('Ringkasan'), overview,
+                                 title_format, header_format, formats)
+        
+        # Tulis lembar lainnya
+        for sheet_num, (name, df) in enumerate(sheets.items()):
+            progress(REPORT_COMPUTE_SHARE + (1 - REPORT_COMPUTE_SHARE) * sheet_num / len(sheets),
+                     f"Menulis lembar {name}")
+            self._write_table(workbook.add_worksheet(name), df, header_format, formats)
+        
+        workbook.close()
+        output.seek(0)
+        progress(1.0, "Selesai")
+        return output
+    
+    def create_report_bundle(self, merged_data, summary_data, cost_data, derived=None, fmt='csv',
+                             progress=None, sections=None):
+        """Laporan sebagai arsip zip berisi satu file CSV/Parquet per lembar"""
+        progress = progress or _no_progress
+        progress(0.0, "Menghitung isi laporan")
+        overview, sheets = self.build_report_data(merged_data, summary_data, cost_data, derived, sections)
+        if overview is not None:
+            sheets = {
+                'Ringkasan': pd.DataFrame(
+                    [(item[0].rstrip(':'), item[1] if item[2] == 'text' else round(float(item[1]), 4))
+                     for item in overview if item is not None],
+                    columns=['Metrik', 'Nilai']
+                ).astype({'Nilai': str}),
+                **sheets,
+            }
+        
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for sheet_num, (name, df) in enumerate(sheets.items()):
+                progress(REPORT_COMPUTE_SHARE + (1 - REPORT_COMPUTE_SHARE) * sheet_num / len(sheets),
+                         f"Menulis {name}")
+                if fmt == 'parquet':
+                    bundle.writestr(f"{name}.parquet", df.to_parquet(index=False))
+                else:
+                    bundle.writestr(f"{name}.csv", df.to_csv(index=False))
+        output.seek(0)
+        progress(1.0, "Selesai")
+        return output
+    
+    def create_report(self, merged_data, summary_data, cost_data, derived=None, fmt='excel',
+                      progress=None, sections=None):
+        """Laporan dalam format REPORT_FORMATS: Excel atau zip CSV/Parquet"""
+        if fmt == 'excel':
+            return self.create_excel_report(merged_data, summary_data, cost_data, derived, progress,
+                                            sections)
+        return self.create_report_bundle(merged_data, summary_data, cost_data, derived, fmt, progress,
+                                         sections)
@@ -0,0 +1,77 @@
+"""Pembuatan laporan di thread latar belakang dengan hasil (bytes) yang di-cache.
+
+Setiap laporan diidentifikasi dengan kunci (sidik jari dataset, versi biaya,
+format). Selama kuncinya sama, bytes yang sudah jadi langsung dipakai ulang;
+begitu data atau biaya berubah, kunci berubah dan laporan dibuat ulang.
+Modul ini tidak mengimpor Streamlit sehingga thread tidak menyentuh UI.
+"""
+import threading
+from collections import OrderedDict
+
+
+class ReportJob:
+    """Status satu pembuatan laporan"""
+
+    def __init__(self):
+        self.progress = 0.0
+        self.label = "Menunggu"
+        self.data = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def update(self, fraction, label):
+        self.progress = fraction
+        self.label = label
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class ReportJobs:
+    """Daftar laporan per kunci; yang terlama dibuang jika melebihi max_entries"""
+
+    def __init__(self, max_entries=4):
+        self.max_entries = max_entries
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+            return job
+
+    def start(self, key, build):
+        """Jalankan build(progress) -> bytes di thread latar jika belum ada untuk kunci ini"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.error is None:
+                return job
+            job = ReportJob()
+            self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            self._evict()
+
+        def run():
+            try:
+                job.data = build(job.update)
+            except Exception as e:
+                job.error = e
+            finally:
+                job._done.set()
+
+        threading.Thread(target=run, name="report-job", daemon=True).start()
+        return job
+
+    def _evict(self):
+        # Laporan yang masih berjalan tidak dibuang
+        for key in list(self._jobs):
+            if len(self._jobs) <= self.max_entries:
+                break
+            if self._jobs[key].done:
+                del self._jobs[key]
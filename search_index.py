@@ -0,0 +1,103 @@
+"""Indeks pencarian Order ID & nama produk, dibangun sekali per dataset.
+
+NgramIndex menyimpan daftar posting trigram: pencarian substring hanya
+memeriksa kandidat dari irisan daftar posting, dan pencarian mirip (fuzzy)
+memberi skor porsi trigram query yang cocok sehingga salah ketik tetap
+menemukan produk. Modul ini tanpa Streamlit.
+"""
+import numpy as np
+import pandas as pd
+
+NGRAM = 3
+# Skor kemiripan trigram minimum untuk hasil pencarian mirip
+FUZZY_MIN_SCORE = 0.5
+
+_NO_POSITIONS = np.array([], dtype=np.int64)
+
+
+def _normalize(values):
+    """Huruf kecil, spasi dirapikan; nilai kosong menjadi ''"""
+    return (
+        pd.Series(values, dtype='string')
+        .fillna('')
+        .str.lower()
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+        .to_numpy(dtype=str)
+    )
+
+
+def _ngrams(text, pad=False):
+    if pad:
+        text = f" {text} "
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class NgramIndex:
+    """Pencarian substring (Order ID, nama produk) & mirip lewat indeks trigram"""
+
+    def __init__(self, values):
+        self._keys = pd.Series(_normalize(values), dtype='string')
+        n = len(self._keys)
+
+        # Semua trigram (kunci berspasi tepi) per posisi awal, tanpa loop per baris
+        padded = ' ' + self._keys + ' '
+        lengths = padded.str.len().to_numpy()
+        positions, grams = [], []
+        for start in range(max(lengths, default=0) - NGRAM + 1):
+            has_gram = lengths >= start + NGRAM
+            positions.append(np.flatnonzero(has_gram))
+            grams.append(padded[has_gram].str.slice(start, start + NGRAM))
+        if not positions:
+            self._gram_counts = np.zeros(n, dtype=np.int64)
+            self._postings = {}
+            return
+        codes, vocabulary = pd.factorize(pd.concat(grams, ignore_index=True))
+
+        # Pasangan (trigram, posisi) unik, terurut per trigram lalu posisi
+        pairs = np.sort(codes.astype(np.int64) * n + np.concatenate(positions))
+        pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+        codes, positions = np.divmod(pairs, n)
+        self._gram_counts = np.bincount(positions, minlength=n)
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], bounds))
+        self._postings = dict(zip(vocabulary[codes[starts]], np.split(positions, bounds)))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, query):
+        """Posisi nilai yang memuat query (tanpa membedakan huruf besar/kecil)"""
+        query = _normalize([query])[0]
+        if not query:
+            return np.arange(len(self._keys))
+        if len(query) < NGRAM:
+            # Query sangat pendek tidak punya trigram; periksa semua kunci
+            return np.flatnonzero(self._keys.str.contains(query, regex=False).to_numpy())
+
+        postings = sorted((self._postings.get(gram, _NO_POSITIONS) for gram in _ngrams(query)), key=len)
+        candidates = postings[0]
+        for ids in postings[1:]:
+            # Irisan dengan daftar jauh lebih panjang lebih mahal daripada memeriksa kandidat langsung
+            if candidates.size == 0 or candidates.size * 16 < ids.size:
+                break
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+        # Trigram yang sama belum tentu berurutan; pastikan query benar-benar ada
+        found = self._keys.iloc[candidates].str.contains(query, regex=False).to_numpy()
+        return candidates[found]
+
+    def fuzzy_search(self, query, limit=20, min_score=FUZZY_MIN_SCORE):
+        """(posisi, skor) nilai termirip dengan query, skor tertinggi lebih dulu"""
+        grams = _ngrams(_normalize([query])[0], pad=True)
+        hits = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not hits:
+            return _NO_POSITIONS, np.array([])
+
+        positions, shared = np.unique(np.concatenate(hits), return_counts=True)
+        # Skor: porsi trigram query yang ditemukan; seri diurutkan dengan Jaccard (nama lebih pendek lebih dulu)
+        scores = shared / len(grams)
+        jaccard = shared / (len(grams) + self._gram_counts[positions] - shared)
+        keep = scores >= min_score
+        positions, scores, jaccard = positions[keep], scores[keep], jaccard[keep]
+        best = np.lexsort((-jaccard, -scores))[:limit]
+        return positions[best], scores[best]
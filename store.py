@@ -0,0 +1,129 @@
+"""Arsip lokal periode yang sudah diproses, dipartisi per toko dan periode.
+
+Struktur folder (Parquet, satu folder per partisi):
+
+    <root>/shop=<toko>/period=<YYYY-MM>/
+        orders.parquet, income.parquet, merged.parquet, summary.parquet, meta.json
+
+Batch dengan --chunksize hanya menyimpan baris pertama per order dari file
+pendapatan; frame itu diarsipkan sebagai income_first_rows.parquet (bukan
+income.parquet) agar tidak dikira data pendapatan lengkap.
+
+meta.json berisi metrik utama sehingga daftar periode bisa ditampilkan
+tanpa membaca file Parquet sama sekali.
+"""
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_STORE_DIR = os.environ.get("INCOME_STORE_DIR", "income_store")
+
+FRAMES = ('orders', 'income', 'income_first_rows', 'merged', 'summary')
+
+
+def infer_period(order_dates):
+    """Periode (YYYY-MM) dari tanggal order (sudah diparsing) paling awal; bulan ini jika tidak ada tanggal"""
+    first_date = order_dates.min()
+    if pd.isna(first_date):
+        return datetime.now().strftime('%Y-%m')
+    return first_date.strftime('%Y-%m')
+
+
+def _safe_name(value):
+    return re.sub(r'[^\w.-]+', '_', str(value).strip()) or '_'
+
+
+class AnalyticsStore:
+    """Simpan & buka kembali hasil pemrosesan per (toko, periode)"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def partition_dir(self, shop, period):
+        return os.path.join(self.root, f"shop={_safe_name(shop)}", f"period={_safe_name(period)}")
+
+    def save(self, shop, period, frames, totals):
+        """Tulis semua frame ke partisi (ditimpa jika sudah ada) secara atomik"""
+        target = self.partition_dir(shop, period)
+        tmp_dir = f"{target}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        for name in FRAMES:
+            if frames.get(name) is not None:
+                frames[name].to_parquet(os.path.join(tmp_dir, f"{name}.parquet"), index=False)
+
+        meta = {
+            'shop': shop,
+            'period': period,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+            'totals': {k: float(v) for k, v in totals.items()},
+        }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        # Partisi lama dipindah dulu, bukan dihapus: selalu ada salah satu versi yang utuh
+        backup_dir = f"{target}.bak"
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        if os.path.exists(target):
+            os.replace(target, backup_dir)
+        try:
+            os.replace(tmp_dir, target)
+        except OSError:
+            if os.path.exists(backup_dir):
+                os.replace(backup_dir, target)
+            raise
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        return target
+
+    def list_periods(self):
+        """Daftar partisi tersimpan beserta metrik utamanya"""
+        rows = []
+        if os.path.isdir(self.root):
+            for shop_dir in sorted(os.listdir(self.root)):
+                shop_path = os.path.join(self.root, shop_dir)
+                if not shop_dir.startswith('shop=') or not os.path.isdir(shop_path):
+                    continue
+                for period_dir in sorted(os.listdir(shop_path)):
+                    meta_path = os.path.join(shop_path, period_dir, 'meta.json')
+                    if not period_dir.startswith('period=') or not os.path.exists(meta_path):
+                        continue
+                    with open(meta_path, encoding='utf-8') as f:
+                        meta = json.load(f)
+                    rows.append({
+                        'Shop': meta['shop'],
+                        'Period': meta['period'],
+                        'Saved At': meta['saved_at'],
+                        **meta['totals'],
+                    })
+        return pd.DataFrame(rows)
+
+    def load(self, shop, period, frames=FRAMES):
+        """Buka kembali frame dari satu partisi"""
+        source = self.partition_dir(shop, period)
+        result = {}
+        for name in frames:
+            path = os.path.join(source, f"{name}.parquet")
+            result[name] = pd.read_parquet(path) if os.path.exists(path) else None
+        return result
+
+    def query_summaries(self, shops=None, periods=None):
+        """Gabungkan ringkasan produk lintas toko/periode dengan kolom Shop & Period"""
+        listing = self.list_periods()
+        if listing.empty:
+            return pd.DataFrame()
+        if shops:
+            listing = listing[listing['Shop'].isin(shops)]
+        if periods:
+            listing = listing[listing['Period'].isin(periods)]
+
+        parts = []
+        for shop, period in zip(listing['Shop'], listing['Period']):
+            summary = self.load(shop, period, frames=('summary',))['summary']
+            if summary is not None:
+                parts.append(summary.assign(Shop=shop, Period=period))
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
@@ -0,0 +1,151 @@
+"""Agregasi berjalan untuk ekspor pendapatan yang sangat besar.
+
+Potongan dari ingest.iter_income_chunks dimasukkan satu per satu ke
+IncomeAggregator. Yang disimpan hanya status per order (baris pertama,
+jumlah per sumber order, status refund), sehingga memori puncak sebanding
+dengan jumlah order unik, bukan jumlah baris file.
+"""
+import numpy as np
+import pandas as pd
+
+from ingest import ORDER_KEY, iter_income_chunks
+
+TOTAL_COLUMNS = ['Total revenue', 'Total settlement amount', 'Total fees']
+SOURCE_COLUMNS = [
+    'Total settlement amount', 'Total fees',
+    'Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee'
+]
+
+
+class IncomeAggregator:
+    """Metrik pendapatan yang diakumulasi per chunk"""
+
+    def __init__(self, compact_every=8):
+        self.compact_every = compact_every
+        self.totals = {col: 0.0 for col in TOTAL_COLUMNS}
+        self.refund_total = 0.0
+        self._first_rows = []
+        self._source_sums = []
+        self._refund_rows = []
+        self._non_refund_keys = []
+
+    def add(self, chunk):
+        """Masukkan satu potongan data pendapatan"""
+        for col in TOTAL_COLUMNS:
+            if col in chunk.columns:
+                self.totals[col] += chunk[col].sum()
+
+        no_value = pd.Series(0.0, index=chunk.index)
+        refund = chunk.get('Customer refund', no_value)
+        affiliate = chunk.get('Affiliate commission', no_value)
+
+        # Baris pertama tiap order (sama seperti drop_duplicates pada file utuh)
+        self._first_rows.append(chunk.drop_duplicates(subset=[ORDER_KEY]))
+
+        # Refund: total semua baris, detail cukup baris unik
+        is_refund = refund < 0
+        self.refund_total += refund[is_refund].sum()
+        self._refund_rows.append(
+            chunk.loc[is_refund, [ORDER_KEY, 'Order/adjustment ID']]
+            .assign(**{'Customer refund': refund[is_refund]})
+            .drop_duplicates()
+        )
+        self._non_refund_keys.append(chunk.loc[refund >= 0, ORDER_KEY].unique())
+
+        # Jumlah per (order, sumber); status refund order baru pasti di akhir file
+        columns = [c for c in SOURCE_COLUMNS if c in chunk.columns]
+        source = np.select([affiliate < 0, affiliate == 0], ['affiliate', 'store'], 'other')
+        self._source_sums.append(
+            chunk[[ORDER_KEY] + columns]
+            .assign(source=source, rows=1)
+            .groupby([ORDER_KEY, 'source'], as_index=False)
+            .sum()
+        )
+
+        if len(self._first_rows) >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        """Gabungkan status yang tertunda agar ukurannya kembali sebanding jumlah order"""
+        if len(self._first_rows) > 1:
+            self._first_rows = [
+                pd.concat(self._first_rows, ignore_index=True).drop_duplicates(subset=[ORDER_KEY])
+            ]
+        if len(self._source_sums) > 1:
+            self._source_sums = [
+                pd.concat(self._source_sums, ignore_index=True)
+                .groupby([ORDER_KEY, 'source'], as_index=False)
+                .sum()
+            ]
+        if len(self._refund_rows) > 1:
+            self._refund_rows = [pd.concat(self._refund_rows, ignore_index=True).drop_duplicates()]
+        if len(self._non_refund_keys) > 1:
+            self._non_refund_keys = [np.unique(np.concatenate(self._non_refund_keys))]
+
+    def income_first_rows(self):
+        """Data pendapatan tanpa duplikat order, siap untuk process_data"""
+        self._compact()
+        return self._first_rows[0] if self._first_rows else pd.DataFrame(columns=[ORDER_KEY])
+
+    def refunds(self):
+        self._compact()
+        return self._refund_rows[0] if self._refund_rows else pd.DataFrame(
+            columns=[ORDER_KEY, 'Order/adjustment ID', 'Customer refund']
+        )
+
+    def non_refund_keys(self):
+        self._compact()
+        return self._non_refund_keys[0] if self._non_refund_keys else np.array([], dtype='int64')
+
+    def clean_order_totals(self, unique_orders):
+        """Jumlah order & pcs yang selesai dan tidak refund"""
+        clean = unique_orders[unique_orders[ORDER_KEY].isin(self.non_refund_keys())]
+        return clean['Order ID'].nunique(), clean['Quantity'].sum()
+
+    def detail_metrics(self):
+        """Metrik tab Detail Data: keuangan, refund, affiliate vs toko, komisi"""
+        refunds = self.refunds()
+        refunded_keys = refunds[ORDER_KEY].unique()
+        distinct_orders = self.income_first_rows()['Order/adjustment ID'].nunique()
+
+        self._compact()
+        sums = self._source_sums[0] if self._source_sums else pd.DataFrame(
+            columns=[ORDER_KEY, 'source', 'rows']
+        )
+        base = sums[~sums[ORDER_KEY].isin(refunded_keys)]
+        by_source = base.drop(columns=[ORDER_KEY]).groupby('source').sum()
+
+        def source_metrics(name):
+            if name not in by_source.index:
+                return {'count': 0, 'fees': 0.0, 'fee_pct': 0, 'revenue': 0.0}
+            row = by_source.loc[name]
+            rev = row.get('Total settlement amount', 0.0)
+            fees = row.get('Total fees', 0.0)
+            return {
+                'count': int(row['rows']),
+                'fees': fees,
+                'fee_pct': (fees / rev * 100) if rev > 0 else 0,
+                'revenue': rev,
+            }
+
+        commission_columns = [c for c in SOURCE_COLUMNS[2:] if c in base.columns]
+        return {
+            'gross_revenue': self.totals['Total revenue'],
+            'net_revenue': self.totals['Total settlement amount'],
+            'total_fees': self.totals['Total fees'],
+            'refund_orders': refunds['Order/adjustment ID'].nunique(),
+            'refund_total': self.refund_total,
+            'refund_rate': (len(refunded_keys) / distinct_orders * 100) if distinct_orders > 0 else 0,
+            'affiliate': source_metrics('affiliate'),
+            'store': source_metrics('store'),
+            'commissions': {c: abs(base[c].sum()) for c in commission_columns},
+            'base_total_fees': base['Total fees'].sum() if 'Total fees' in base.columns else 0.0,
+        }
+
+
+def aggregate_income(source, fmt='excel', chunksize=50_000):
+    """Baca file pendapatan per potongan langsung ke agregator"""
+    aggregator = IncomeAggregator()
+    for chunk in iter_income_chunks(source, fmt=fmt, chunksize=chunksize):
+        aggregator.add(chunk)
+    return aggregator
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul aplikasi berada di root repo (bukan paket)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,187 @@
+import pytest
+
+from cost_backends import GoogleSheetCostBackend, records_to_costs
+
+
+def make_records(*rows):
+    return [{"product_name": name, "cost_per_unit": cost} for name, cost in rows]
+
+
+def apply_updates(records, updates):
+    """Terapkan hasil build_cost_updates ke salinan isi sheet (baris 1 = header)"""
+    sheet = {1: ["product_name", "cost_per_unit"]} if records else {}
+    for row_num, row in enumerate(records, start=2):
+        sheet[row_num] = [row["product_name"], row["cost_per_unit"]]
+    for update in updates:
+        start, end = (int(cell[1:]) for cell in update["range"].split(":"))
+        assert len(update["values"]) == end - start + 1
+        for row_num, values in zip(range(start, end + 1), update["values"]):
+            sheet[row_num] = values
+    header, *rows = [sheet[row_num] for row_num in sorted(sheet)]
+    assert header == ["product_name", "cost_per_unit"]
+    return make_records(*rows)
+
+
+def data_rows(records):
+    """Baris terisi harus rapat di atas, tanpa lubang di antaranya"""
+    names = [row["product_name"] for row in records]
+    filled = len([name for name in names if name != ""])
+    assert all(name != "" for name in names[:filled])
+    return names[:filled]
+
+
+@pytest.fixture
+def backend():
+    return GoogleSheetCostBackend(None, "sheet-id", "Sheet1")
+
+
+def test_unchanged_costs_write_nothing(backend):
+    records = make_records(("A", 1), ("B", 2))
+    assert backend.build_cost_updates(records, {"A": 1.0, "B": 2.0}) == []
+
+
+def test_changed_cost_is_written_in_place(backend):
+    records = make_records(("A", 1), ("B", 2), ("C", 3))
+    updates = backend.build_cost_updates(records, {"A": 1, "B": 5, "C": 3})
+    assert updates == [{"range": "A3:B3", "values": [["B", 5]]}]
+
+
+def test_delete_moves_last_row_into_the_hole(backend):
+    records = make_records(("A", 1), ("B", 2), ("C", 3))
+    updates = backend.build_cost_updates(records, {"A": 1, "C": 3})
+    assert updates == [{"range": "A3:B4", "values": [["C", 3], ["", ""]]}]
+
+    result = apply_updates(records, updates)
+    assert records_to_costs(result) == {"A": 1, "C": 3}
+    assert data_rows(result) == ["A", "C"]
+
+
+def test_delete_last_row_only_blanks_it(backend):
+    records = make_records(("A", 1), ("B", 2), ("C", 3))
+    updates = backend.build_cost_updates(records, {"A": 1, "B": 2})
+    assert updates == [{"range": "A4:B4", "values": [["", ""]]}]
+
+
+def test_new_product_fills_existing_hole_before_appending(backend):
+    records = make_records(("A", 1), ("", ""), ("C", 3))
+    updates = backend.build_cost_updates(records, {"A": 1, "C": 3, "D": 4})
+    assert updates == [{"range": "A3:B3", "values": [["D", 4]]}]
+
+    result = apply_updates(records, updates)
+    assert records_to_costs(result) == {"A": 1, "C": 3, "D": 4}
+
+
+def test_new_product_is_appended_when_there_are_no_holes(backend):
+    records = make_records(("A", 1))
+    updates = backend.build_cost_updates(records, {"A": 1, "D": 4})
+    assert updates == [{"range": "A3:B3", "values": [["D", 4]]}]
+
+
+def test_empty_sheet_gets_header(backend):
+    updates = backend.build_cost_updates([], {"A": 1})
+    assert updates == [{"range": "A1:B2", "values": [["product_name", "cost_per_unit"], ["A", 1]]}]
+
+
+def test_remaining_holes_are_compacted(backend):
+    records = make_records(("A", 1), ("", ""), ("", ""), ("D", 4))
+    updates = backend.build_cost_updates(records, {"A": 1, "D": 4})
+    assert updates == [{"range": "A3:B5", "values": [["D", 4], ["", ""], ["", ""]]}]
+
+    result = apply_updates(records, updates)
+    assert data_rows(result) == ["A", "D"]
+
+
+def test_duplicate_product_keeps_last_value_in_one_row(backend):
+    records = make_records(("A", 1), ("B", 2), ("A", 5))
+    updates = backend.build_cost_updates(records, {"A": 5, "B": 2})
+
+    result = apply_updates(records, updates)
+    assert records_to_costs(result) == {"A": 5, "B": 2}
+    assert data_rows(result) == ["A", "B"]
+
+
+def test_duplicate_product_with_new_cost_is_written_once(backend):
+    records = make_records(("A", 1), ("B", 2), ("A", 5))
+    updates = backend.build_cost_updates(records, {"A": 7, "B": 2})
+
+    result = apply_updates(records, updates)
+    assert records_to_costs(result) == {"A": 7, "B": 2}
+    assert data_rows(result) == ["A", "B"]
+
+
+def test_mixed_changes_match_target_costs(backend):
+    records = make_records(("A", 1), ("B", 2), ("C", 3), ("D", 4), ("E", 5))
+    target = {"A": 1, "C": 30, "E": 5, "F": 6}
+    result = apply_updates(records, backend.build_cost_updates(records, target))
+    assert records_to_costs(result) == target
+    assert sorted(data_rows(result)) == sorted(target)
+
+
+class FakeWorksheet:
+    """Worksheet gspread tiruan: baris 1 header, mencatat pemanggilan API"""
+
+    def __init__(self, rows):
+        self.rows = [["product_name", "cost_per_unit"]] + [list(row) for row in rows]
+        self.calls = []
+
+    def get_all_records(self):
+        self.calls.append("get_all_records")
+        return make_records(*[tuple(row) for row in self.rows[1:]])
+
+    def batch_get(self, ranges):
+        self.calls.append("batch_get")
+        result = []
+        for a1 in ranges:
+            start, end = (int(cell[1:]) for cell in a1.split(":"))
+            values = [[self.rows[r - 1][0]] if r - 1 < len(self.rows) else [] for r in range(start, end + 1)]
+            while values and values[-1] in ([], [""]):
+                values.pop()
+            result.append(values)
+        return result
+
+    def batch_update(self, updates):
+        self.calls.append("batch_update")
+        for update in updates:
+            start, end = (int(cell[1:]) for cell in update["range"].split(":"))
+            for row_num, values in zip(range(start, end + 1), update["values"]):
+                while len(self.rows) < row_num:
+                    self.rows.append(["", ""])
+                self.rows[row_num - 1] = list(values)
+
+
+def sheet_costs(worksheet):
+    return records_to_costs(make_records(*[tuple(row) for row in worksheet.rows[1:]]))
+
+
+def test_write_with_fresh_cache_reads_only_target_rows(backend):
+    worksheet = FakeWorksheet([("A", 1), ("B", 2), ("C", 3)])
+    backend._worksheet = worksheet
+    cached = worksheet.get_all_records()
+    worksheet.calls.clear()
+
+    backend.write(cached, {"A": 1, "B": 5, "C": 3})
+    assert worksheet.calls == ["batch_get", "batch_update"]
+    assert sheet_costs(worksheet) == {"A": 1, "B": 5, "C": 3}
+
+
+def test_write_with_stale_cache_refetches_before_writing(backend):
+    worksheet = FakeWorksheet([("A", 1), ("B", 2), ("C", 3)])
+    backend._worksheet = worksheet
+    cached = worksheet.get_all_records()
+    # Sheet diurutkan & diberi baris baru langsung di Google Sheets setelah cache dibaca
+    worksheet.rows[1:] = [["X", 9], ["C", 3], ["B", 2], ["A", 1]]
+    worksheet.calls.clear()
+
+    backend.write(cached, {"A": 1, "B": 5, "C": 3, "X": 9})
+    assert worksheet.calls == ["batch_get", "get_all_records", "batch_update"]
+    assert sheet_costs(worksheet) == {"A": 1, "B": 5, "C": 3, "X": 9}
+
+
+def test_write_appending_row_detects_rows_added_in_sheet(backend):
+    worksheet = FakeWorksheet([("A", 1)])
+    backend._worksheet = worksheet
+    cached = worksheet.get_all_records()
+    worksheet.rows.append(["Y", 7])
+
+    backend.write(cached, {"A": 1, "Y": 7, "D": 4})
+    assert sheet_costs(worksheet) == {"A": 1, "Y": 7, "D": 4}
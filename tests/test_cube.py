@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from ingest import INCOME_SCHEMA, ORDER_SCHEMA, apply_schema
+from pipeline import IncomePipeline
+
+COSTS = {'Kaos': 20.0, 'Topi': 10.0}
+
+
+@pytest.fixture
+def processed():
+    columns = ['Order ID', 'Order Status', 'Seller SKU', 'Product Name', 'Variation', 'Quantity',
+               'Created Time']
+    orders = apply_schema(pd.DataFrame([
+        ('1', 'Selesai', 'K1', 'Kaos', 'Merah', 2, '01/03/2025 10:00'),
+        ('2', 'Selesai', 'K1', 'Kaos', 'Biru', 1, '01/03/2025 12:00'),
+        ('3', 'Selesai', 'K1', 'Kaos', 'Merah', 1, '01/10/2025 09:00'),
+        ('4', 'Selesai', 'T1', 'Topi', 'Hitam', 3, '01/20/2025 08:00'),
+        ('5', 'Selesai', 'T1', 'Topi', 'Hitam', 1, 'tanggal rusak'),
+    ], columns=columns), ORDER_SCHEMA)
+    income = apply_schema(pd.DataFrame({
+        'Order/adjustment ID': ['1', '2', '3', '4', '5'],
+        'Total settlement amount': [100.0, 45.0, 50.0, 90.0, 30.0],
+    }), INCOME_SCHEMA)
+    pipeline = IncomePipeline()
+    merged, summary = pipeline.process_data(orders, income, COSTS)
+    derived = pipeline.build_derived_data(merged, income)
+    return pipeline, summary, derived
+
+
+def by_product(summary):
+    keys = ['Seller SKU', 'Product Name', 'Variation']
+    return summary.sort_values(keys).reset_index(drop=True)
+
+
+def test_cube_summary_keeps_variation_breakdown(processed):
+    pipeline, summary, derived = processed
+    cube = derived['daily_cube']
+
+    range_summary = pipeline.cube_product_summary(cube, COSTS)
+    # Semua order Kaos bertanggal: ringkasan kubus sama dengan summary_data per variasi
+    is_kaos = range_summary['Product Name'] == 'Kaos'
+    pd.testing.assert_frame_equal(
+        by_product(range_summary[is_kaos]), by_product(summary[summary['Product Name'] == 'Kaos']),
+        check_dtype=False
+    )
+    # Order Topi tanpa tanggal tidak ikut ringkasan rentang
+    assert range_summary.loc[~is_kaos, ['TotalQty', 'Revenue']].values.tolist() == [[3, 90.0]]
+
+
+def test_cube_slice_sums_to_range(processed):
+    pipeline, _, derived = processed
+    cube = pipeline.cube_with_costs(derived['daily_cube'], COSTS)
+
+    totals = pipeline.cube_totals(pipeline.slice_cube(cube, '2025-01-03', '2025-01-10'))
+    assert totals['Total Orders'] == 3
+    assert totals['Total Quantity'] == 4
+    assert totals['Total Revenue'] == 195.0
+    # Order 5 tidak bertanggal sehingga tidak masuk kubus sama sekali
+    assert pipeline.cube_totals(cube)['Total Orders'] == 4
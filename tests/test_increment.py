@@ -0,0 +1,118 @@
+import pandas as pd
+import pytest
+
+from ingest import INCOME_SCHEMA, ORDER_KEY, ORDER_SCHEMA, apply_schema
+from pipeline import IncomePipeline
+
+GROUP_KEYS = ['Seller SKU', 'Product Name', 'Variation']
+COSTS = {'Kaos': 20.0, 'Topi': 10.0, 'Tas': 50.0}
+
+
+def make_orders(*rows):
+    """Baris (order id, status, sku, produk, variasi, qty) dengan tipe seperti read_orders"""
+    columns = ['Order ID', 'Order Status', 'Seller SKU', 'Product Name', 'Variation', 'Quantity']
+    return apply_schema(pd.DataFrame(rows, columns=columns), ORDER_SCHEMA)
+
+
+def make_income(*rows):
+    """Baris (order id, settlement) dengan tipe seperti read_income"""
+    return apply_schema(pd.DataFrame(rows, columns=['Order/adjustment ID', 'Total settlement amount']),
+                        INCOME_SCHEMA)
+
+
+@pytest.fixture
+def pipeline():
+    return IncomePipeline()
+
+
+@pytest.fixture
+def base():
+    orders = make_orders(
+        ('1', 'Selesai', 'K1', 'Kaos', 'Merah', 2),
+        ('1', 'Selesai', 'T1', 'Topi', 'Hitam', 1),
+        ('2', 'Selesai', 'K1', 'Kaos', 'Merah', 1),
+        ('3', 'Selesai', 'T1', 'Topi', 'Hitam', 3),
+        ('4', 'Dibatalkan', 'K1', 'Kaos', 'Biru', 1),
+    )
+    income = make_income(('1', 100.0), ('2', 60.0), ('3', 90.0), ('3', 5.0))
+    return orders, income
+
+
+def full_recompute(pipeline, orders, income, new_orders, new_income):
+    """Hasil process_data pada data lama yang sudah di-upsert dengan data baru"""
+    orders = _upsert(orders, new_orders, 'Order ID')
+    income = _upsert(income, new_income, 'Order/adjustment ID')
+    return pipeline.process_data(orders, income, COSTS)
+
+
+def _upsert(existing, new_rows, id_column):
+    keep = existing[~existing[id_column].isin(new_rows[id_column])]
+    return pd.concat([keep, new_rows], ignore_index=True)
+
+
+def assert_same_result(pipeline, base, new_orders, new_income):
+    orders, income = base
+    merged, summary = pipeline.process_data(orders, income, COSTS)
+    _, _, inc_merged, inc_summary = pipeline.apply_increment(
+        orders, income, merged, summary, new_orders, new_income, COSTS
+    )
+    full_merged, full_summary = full_recompute(pipeline, orders, income, new_orders, new_income)
+
+    def normalized(df):
+        return df.sort_values(GROUP_KEYS).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(normalized(inc_summary), normalized(full_summary),
+                                  check_dtype=False)
+    assert sorted(inc_merged[ORDER_KEY]) == sorted(full_merged[ORDER_KEY])
+    return inc_summary
+
+
+def test_increment_with_new_orders_matches_full_recompute(pipeline, base):
+    new_orders = make_orders(('5', 'Selesai', 'K1', 'Kaos', 'Merah', 4))
+    new_income = make_income(('5', 200.0))
+    assert_same_result(pipeline, base, new_orders, new_income)
+
+
+def test_reuploaded_order_replaces_instead_of_double_counting(pipeline, base):
+    # Order 1 diunggah ulang: qty Kaos berubah, Topi hilang, pendapatan dikoreksi
+    new_orders = make_orders(('1', 'Selesai', 'K1', 'Kaos', 'Merah', 3))
+    new_income = make_income(('1', 150.0))
+    summary = assert_same_result(pipeline, base, new_orders, new_income)
+
+    kaos = summary.set_index('Product Name').loc['Kaos']
+    assert kaos['TotalQty'] == 4
+    assert kaos['Revenue'] == 210.0
+
+
+def test_reuploading_identical_data_changes_nothing(pipeline, base):
+    orders, income = base
+    merged, summary = pipeline.process_data(orders, income, COSTS)
+    _, _, _, again = pipeline.apply_increment(orders, income, merged, summary, orders, income, COSTS)
+    pd.testing.assert_frame_equal(again.sort_values(GROUP_KEYS).reset_index(drop=True),
+                                  summary.sort_values(GROUP_KEYS).reset_index(drop=True),
+                                  check_dtype=False)
+
+
+def test_increment_with_new_products(pipeline, base):
+    new_orders = make_orders(
+        ('6', 'Selesai', 'B1', 'Tas', 'Coklat', 1),
+        ('7', 'Selesai', 'K1', 'Kaos', 'Biru', 2),
+    )
+    new_income = make_income(('6', 300.0), ('7', 80.0))
+    summary = assert_same_result(pipeline, base, new_orders, new_income)
+    assert {'Tas', 'Kaos'} <= set(summary['Product Name'])
+    assert ('K1', 'Kaos', 'Biru') in set(map(tuple, summary[GROUP_KEYS].to_numpy()))
+
+
+def test_cancelled_reupload_removes_product_without_orders(pipeline, base):
+    # Satu-satunya order Topi yang lain (3) dibatalkan & order 1 tanpa Topi
+    new_orders = make_orders(
+        ('3', 'Dibatalkan', 'T1', 'Topi', 'Hitam', 3),
+        ('1', 'Selesai', 'K1', 'Kaos', 'Merah', 2),
+    )
+    summary = assert_same_result(pipeline, base, new_orders, make_income(('1', 100.0)))
+    assert 'Topi' not in set(summary['Product Name'])
+
+
+def test_income_only_increment(pipeline, base):
+    assert_same_result(pipeline, base, make_orders(), make_income(('2', 75.0)))
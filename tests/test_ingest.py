@@ -0,0 +1,112 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from ingest import (
+    ORDER_DATE, ORDER_KEY, iter_income_chunks, order_keys, parse_dates, read_income,
+    unparsed_order_dates, with_order_date, with_order_key,
+)
+from streaming import aggregate_income
+
+
+@pytest.fixture
+def multi_sheet_income(tmp_path):
+    """Ekspor pendapatan di lembar pertama, lembar aktif berisi catatan lain"""
+    workbook = Workbook()
+    data = workbook.active
+    data.title = "Data"
+    data.append(['Order/adjustment ID', 'Total settlement amount', 'Customer refund',
+                 'Affiliate commission', 'Total fees'])
+    rows = [
+        ('576000000000000001', 100.0, 0, -5, -10),
+        ('576000000000000002', 200.0, 0, 0, -20),
+        ('576000000000000001', 0.0, -50, 0, 0),
+        ('ADJ-7', 30.0, 0, 0, -1),
+        (1001, 300.0, 0, -7, -30),
+    ]
+    for row in rows:
+        data.append(row)
+    notes = workbook.create_sheet("Catatan")
+    notes.append(['Keterangan'])
+    notes.append(['bukan data pendapatan'])
+    workbook.active = 1
+    path = tmp_path / "income.xlsx"
+    workbook.save(path)
+    return path
+
+
+def test_chunked_reader_uses_first_sheet_like_read_income(multi_sheet_income):
+    expected = read_income(multi_sheet_income)
+    chunks = list(iter_income_chunks(multi_sheet_income, chunksize=2))
+    assert len(chunks) == 3
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_chunked_aggregation_matches_read_income(multi_sheet_income):
+    expected = read_income(multi_sheet_income).drop_duplicates(subset=[ORDER_KEY])
+    aggregated = aggregate_income(multi_sheet_income, chunksize=2).income_first_rows()
+    pd.testing.assert_frame_equal(aggregated.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def test_order_keys_mixed_ids_do_not_collide():
+    ids = pd.Series(['576000000000000001', ' 1001 ', 'ADJ-7', '1001', 'adj-7', None, '',
+                     '1234567890123456789'])
+    keys = order_keys(ids)
+
+    # ID angka (maks. 18 digit) menjadi kuncinya sendiri, ID lain di-hash ke ruang negatif
+    assert keys.iloc[0] == 576000000000000001
+    assert keys.iloc[1] == keys.iloc[3] == 1001
+    assert (keys.iloc[[2, 4, 5, 6, 7]] < 0).all()
+    assert keys.iloc[2] != keys.iloc[4]
+    assert keys.index.equals(ids.index)
+    assert keys.dtype == 'int64'
+
+
+def test_order_keys_are_stable_across_calls_and_frames():
+    ids = pd.Series(['ADJ-7', '42', 'RF-0001'])
+    first = order_keys(ids)
+    # Urutan & konteks lain (file pendapatan vs pesanan) tidak mengubah kunci per nilai
+    other = order_keys(pd.Series(['RF-0001', 'X', 'ADJ-7'], index=[10, 11, 12]))
+    assert first.tolist() == order_keys(ids.copy()).tolist()
+    assert other.loc[10] == first.iloc[2]
+    assert other.loc[12] == first.iloc[0]
+
+
+def test_with_order_key_keeps_existing_key():
+    df = pd.DataFrame({'Order ID': ['1', 'A'], ORDER_KEY: [7, 8]})
+    assert with_order_key(df, 'Order ID')[ORDER_KEY].tolist() == [7, 8]
+    fresh = with_order_key(df.drop(columns=ORDER_KEY), 'Order ID')
+    assert fresh[ORDER_KEY].tolist() == order_keys(df['Order ID']).tolist()
+
+
+def test_parse_dates_prefers_order_that_parses_most_rows():
+    # 25/12 hanya valid sebagai hari/bulan, sehingga 03/04 dibaca 3 April
+    dates = parse_dates(pd.Series(['03/04/2025', '25/12/2025', '01/02/2025']))
+    assert dates.tolist() == [pd.Timestamp('2025-04-03'), pd.Timestamp('2025-12-25'),
+                              pd.Timestamp('2025-02-01')]
+
+
+def test_parse_dates_ambiguous_defaults_to_month_first():
+    dates = parse_dates(pd.Series(['03/04/2025', '05/06/2025']))
+    assert dates.tolist() == [pd.Timestamp('2025-03-04'), pd.Timestamp('2025-05-06')]
+
+
+def test_parse_dates_never_swaps_year_month_day():
+    dates = parse_dates(pd.Series(['2025/01/05 10:00:00', '2025/02/01 08:30:00']))
+    assert dates.dt.month.tolist() == [1, 2]
+    assert dates.dt.day.tolist() == [5, 1]
+
+
+def test_unparsed_order_dates_counts_only_unparseable_values():
+    df = pd.DataFrame({
+        'Order ID': ['1', '2', '3', '4', '5'],
+        'Order created time(UTC)': ['2025/01/05', 'bukan tanggal', None, ' ', 'rusak'],
+        'Order settled time(UTC)': [None, None, None, None, '2025/01/09'],
+    })
+    unparsed = unparsed_order_dates(df)
+    # Baris 5 terisi dari kolom berikutnya; baris 3-4 tanpa nilai tanggal sama sekali
+    assert unparsed['Order ID'].tolist() == ['2']
+
+    dated = with_order_date(df)
+    assert dated[ORDER_DATE].isna().tolist() == [False, True, True, True, False]
+    assert dated.loc[4, ORDER_DATE] == pd.Timestamp('2025-01-09')
@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from pipeline import IncomePipeline
+
+
+def test_excel_report_writes_non_finite_values_as_blank_cells():
+    pipeline = IncomePipeline()
+    orders = pd.DataFrame({
+        'Order ID': ['1', '2', '3'],
+        'Order Status': ['Selesai'] * 3,
+        'Seller SKU': ['S1', 'S2', 'S3'],
+        'Product Name': ['A', 'B', 'C'],
+        'Variation': ['v'] * 3,
+        'Quantity': [2, 1, 1],
+    })
+    # B tanpa pendapatan (margin -inf), C tanpa biaya & pendapatan (margin NaN)
+    income = pd.DataFrame({'Order/adjustment ID': ['1', '2', '3'],
+                           'Total settlement amount': [100.0, 0.0, 0.0]})
+    cost_data = {'A': 10.0, 'B': 5.0}
+    merged, summary = pipeline.process_data(orders, income, cost_data)
+    assert not np.isfinite(summary.set_index('Product Name').loc[['B', 'C'], 'Profit Margin %']).any()
+
+    report = pipeline.create_excel_report(merged, summary, cost_data,
+                                          sections=['Ringkasan', 'Ringkasan per Produk'])
+    workbook = load_workbook(io.BytesIO(report.getvalue()))
+
+    for worksheet in workbook.worksheets:
+        for row in worksheet.iter_rows(values_only=True):
+            for value in row:
+                assert not (isinstance(value, str) and value.startswith(('=', '#'))), value
+
+    products = workbook['Ringkasan per Produk']
+    header = [cell.value for cell in products[1]]
+    margins = {row[header.index('Product Name')]: row[header.index('Profit Margin %')]
+               for row in products.iter_rows(min_row=2, values_only=True)}
+    assert margins == {'A': 80.0, 'B': None, 'C': None}
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from search_index import NgramIndex
+
+
+def contains_positions(values, query):
+    return np.flatnonzero(pd.Series(values, dtype='string').fillna('').str.lower()
+                          .str.contains(query.lower(), regex=False).to_numpy())
+
+
+def test_order_id_search_matches_any_part_of_the_id():
+    ids = ['576000000000000201', '576000000000000266', '581234567890000266', '576999']
+    index = NgramIndex(ids)
+    for query in ['576', '0266', '1234', '99', '6', '576000000000000266', '777']:
+        assert index.search(query).tolist() == contains_positions(ids, query).tolist()
+
+
+def test_product_search_ignores_case_and_extra_spaces():
+    names = ['Kaos Polos Hitam XL', 'kaos  polos putih', 'Topi Baseball', None]
+    index = NgramIndex(names)
+    assert index.search('KAOS POLOS').tolist() == [0, 1]
+    assert index.search('  topi ').tolist() == [2]
+    assert index.search('').tolist() == [0, 1, 2, 3]
+    assert index.search('zzz').tolist() == []
+
+
+def test_fuzzy_search_finds_typos():
+    names = ['Kaos Polos Hitam XL', 'Celana Jeans Slim', 'Jaket Hoodie Hitam']
+    index = NgramIndex(names)
+    positions, scores = index.fuzzy_search('hodie')
+    assert positions.tolist() == [2]
+    assert index.fuzzy_search('celna jens')[0].tolist() == [1]
+    assert index.fuzzy_search('xyz')[0].tolist() == []
+
+
+def test_empty_index():
+    index = NgramIndex([])
+    assert len(index) == 0
+    assert index.search('abc').tolist() == []
+    assert index.fuzzy_search('abc')[0].tolist() == []
@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pytest
+
+import store
+from store import AnalyticsStore
+
+
+def frames(value):
+    return {
+        'orders': pd.DataFrame({'Order ID': ['1'], 'Quantity': [value]}),
+        'summary': pd.DataFrame({'Seller SKU': ['A'], 'Total Revenue': [value * 10.0]}),
+    }
+
+
+def test_save_replaces_partition_without_leftovers(tmp_path):
+    archive = AnalyticsStore(tmp_path)
+    archive.save('Toko', '2025-01', {**frames(1), 'income': pd.DataFrame({'x': [1]})}, {'Profit': 1})
+    target = archive.save('Toko', '2025-01', frames(2), {'Profit': 2})
+
+    loaded = archive.load('Toko', '2025-01')
+    assert loaded['orders']['Quantity'].tolist() == [2]
+    # Frame yang tidak ada di penyimpanan baru tidak tertinggal dari versi lama
+    assert loaded['income'] is None
+    assert sorted(os.listdir(os.path.dirname(target))) == ['period=2025-01']
+    assert archive.list_periods()['Profit'].tolist() == [2.0]
+
+
+def test_failed_swap_keeps_previous_partition(tmp_path, monkeypatch):
+    archive = AnalyticsStore(tmp_path)
+    target = archive.save('Toko', '2025-01', frames(1), {'Profit': 1})
+
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        if src.endswith('.tmp'):
+            raise OSError("disk penuh")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(store.os, 'replace', failing_replace)
+    with pytest.raises(OSError):
+        archive.save('Toko', '2025-01', frames(2), {'Profit': 2})
+    monkeypatch.undo()
+
+    assert os.path.isdir(target)
+    assert archive.load('Toko', '2025-01')['orders']['Quantity'].tolist() == [1]
+
+
+def test_first_rows_income_is_stored_under_its_own_key(tmp_path):
+    archive = AnalyticsStore(tmp_path)
+    first_rows = pd.DataFrame({'Order/adjustment ID': ['1'], 'Total settlement amount': [5.0]})
+    archive.save('Toko', '2025-01', {**frames(1), 'income_first_rows': first_rows}, {})
+
+    loaded = archive.load('Toko', '2025-01')
+    assert loaded['income'] is None
+    pd.testing.assert_frame_equal(loaded['income_first_rows'], first_rows)
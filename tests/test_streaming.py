@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from ingest import INCOME_SCHEMA, ORDER_KEY, apply_schema, with_order_key
+from streaming import IncomeAggregator
+
+COLUMNS = ['Order/adjustment ID', 'Total revenue', 'Total settlement amount', 'Total fees',
+           'Customer refund', 'Affiliate commission', 'Dynamic Commission',
+           'TikTok Shop commission fee']
+
+
+@pytest.fixture
+def income():
+    """Baris pendapatan; order 2 (refund) dan 3 (affiliate) tersebar melewati batas potongan"""
+    rows = [
+        ('1', 120, 100, -20, 0, 0, -2, -8),
+        ('2', 200, 180, -20, 0, -5, -1, -9),
+        ('3', 150, 130, -20, 0, -10, -3, -7),
+        # --- batas potongan (chunksize 3) ---
+        ('2', 0, -50, 0, -50, 0, 0, 0),
+        ('3', 30, 25, -5, 0, -4, 0, -1),
+        ('4', 90, 80, -10, 0, 0, -1, -4),
+        # --- batas potongan ---
+        ('ADJ-9', 0, -15, 0, -15, 0, 0, 0),
+        ('5', 60, 55, -5, 0, -2, 0, -3),
+        ('2', 0, -10, 0, -10, 0, 0, 0),
+        # --- batas potongan ---
+        ('4', 10, 8, -2, 0, 0, 0, -2),
+    ]
+    df = apply_schema(pd.DataFrame(rows, columns=COLUMNS), INCOME_SCHEMA)
+    return with_order_key(df, 'Order/adjustment ID')
+
+
+def aggregate(income, chunksize, compact_every=8):
+    aggregator = IncomeAggregator(compact_every=compact_every)
+    for start in range(0, len(income), chunksize):
+        aggregator.add(income.iloc[start:start + chunksize])
+    return aggregator
+
+
+@pytest.mark.parametrize('chunksize, compact_every', [(1, 2), (3, 2), (3, 8), (4, 1)])
+def test_chunked_aggregation_matches_single_piece(income, chunksize, compact_every):
+    whole = aggregate(income, len(income))
+    chunked = aggregate(income, chunksize, compact_every)
+
+    assert chunked.detail_metrics() == whole.detail_metrics()
+    pd.testing.assert_frame_equal(chunked.income_first_rows().reset_index(drop=True),
+                                  whole.income_first_rows().reset_index(drop=True))
+
+    unique_orders = pd.DataFrame({
+        'Order ID': ['1', '2', '3', '4', '5'],
+        'Quantity': [1, 2, 3, 4, 5],
+    }).pipe(with_order_key, 'Order ID')
+    assert chunked.clean_order_totals(unique_orders) == whole.clean_order_totals(unique_orders)
+
+
+def test_detail_metrics_values(income):
+    metrics = aggregate(income, 3, compact_every=1).detail_metrics()
+
+    assert metrics['gross_revenue'] == 660
+    assert metrics['refund_orders'] == 2
+    assert metrics['refund_total'] == -75
+    # Order 2 & ADJ-9 direfund dari 6 order berbeda
+    assert metrics['refund_rate'] == pytest.approx(2 / 6 * 100)
+    # Semua baris order 3 dan 5 (affiliate < 0) masuk affiliate, termasuk baris setelah batas potongan
+    assert metrics['affiliate']['count'] == 3
+    assert metrics['affiliate']['revenue'] == 130 + 25 + 55
+    assert metrics['store']['count'] == 3
+    assert metrics['store']['revenue'] == 100 + 80 + 8
+    assert metrics['commissions']['Affiliate commission'] == 16
+
+
+def test_first_rows_keep_first_row_per_order(income):
+    first_rows = aggregate(income, 2, compact_every=1).income_first_rows()
+    assert first_rows['Order/adjustment ID'].tolist() == ['1', '2', '3', '4', 'ADJ-9', '5']
+    assert first_rows.set_index('Order/adjustment ID').loc['2', 'Total settlement amount'] == 180
+    assert first_rows[ORDER_KEY].is_unique